@@ -0,0 +1,196 @@
+# app/bulk_embedder.py
+
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+BULK_EMBED_MODEL = "all-mpnet-base-v2"
+BULK_EMBED_SHARD_SIZE = 2048
+BULK_EMBED_BATCH_SIZE = 64
+BULK_EMBED_CHECKPOINT_DIR = "app/data/embed_checkpoint"
+CPU_COUNT = os.cpu_count() or 1
+
+
+# === Worker side ===
+_encoder = None
+
+def _init_encoder(model_name: str, threads_per_worker: int):
+    global _encoder
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads_per_worker)
+    _encoder = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_shard(shard_id: int, texts: list[str], batch_size: int):
+    embeddings = _encoder.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+    return shard_id, np.asarray(embeddings, dtype=np.float32)
+
+
+# === Output ===
+class ShardedEmbeddings:
+    """
+    Embeddings for `rows` (indices into the unique texts) backed by the shard
+    files on disk. Blocks are gathered lazily so the full matrix never has to be
+    held in memory while it is written into a snapshot.
+    """
+
+    def __init__(self, shard_paths: list[str], shard_size: int, rows: np.ndarray, block_rows: int = 65536):
+        self.shards = [np.load(p, mmap_mode="r") for p in shard_paths]
+        self.shard_size = shard_size
+        self.rows = rows
+        self.block_rows = block_rows
+        dim = self.shards[0].shape[1] if self.shards else 0
+        self.shape = (len(rows), dim)
+
+    def iter_blocks(self):
+        for start in range(0, len(self.rows), self.block_rows):
+            rows = self.rows[start:start + self.block_rows]
+            shard_ids = rows // self.shard_size
+            offsets = rows % self.shard_size
+            block = np.empty((len(rows), self.shape[1]), dtype=np.float32)
+            for shard_id in np.unique(shard_ids):
+                mask = shard_ids == shard_id
+                block[mask] = self.shards[shard_id][offsets[mask]]
+            yield block
+
+    def to_array(self) -> np.ndarray:
+        if not len(self.rows):
+            return np.zeros(self.shape, dtype=np.float32)
+        return np.vstack(list(self.iter_blocks()))
+
+
+class BulkEmbeddingJob:
+    """
+    Embed a large corpus with several worker processes.
+
+    Identical texts are embedded once. The unique texts are split into fixed-size
+    shards, encoded in parallel and checkpointed one file per shard, so an
+    interrupted rebuild resumes from the shards already on disk. Results are
+    reassembled in the original chunk order.
+
+    The checkpoint directory belongs to one job at a time: app.order_vector only
+    runs a job while holding its snapshot build lock, so concurrent workers
+    neither share shards nor each start a full pool of encoder processes.
+    """
+
+    def __init__(self, texts, workers: int = CPU_COUNT, shard_size: int = BULK_EMBED_SHARD_SIZE,
+                 batch_size: int = BULK_EMBED_BATCH_SIZE, model_name: str = BULK_EMBED_MODEL,
+                 checkpoint_dir: str = BULK_EMBED_CHECKPOINT_DIR, progress=None):
+        self.texts = list(texts)
+        self.workers = max(1, workers)
+        self.shard_size = shard_size
+        self.batch_size = batch_size
+        self.model_name = model_name
+        self.checkpoint_dir = checkpoint_dir
+        self.progress = progress or print_progress
+
+        unique_rows = {}
+        self.unique_texts = []
+        rows = np.empty(len(self.texts), dtype=np.int64)
+        for i, text in enumerate(self.texts):
+            row = unique_rows.get(text)
+            if row is None:
+                row = unique_rows[text] = len(self.unique_texts)
+                self.unique_texts.append(text)
+            rows[i] = row
+        self.rows = rows
+        self.n_shards = (len(self.unique_texts) + shard_size - 1) // shard_size
+        self.stats = {}
+
+    def _fingerprint(self) -> str:
+        digest = hashlib.md5(f"{self.model_name}|{self.shard_size}|".encode("utf-8"))
+        for text in self.unique_texts:
+            digest.update(text.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _shard_path(self, shard_id: int) -> str:
+        return os.path.join(self.checkpoint_dir, f"shard_{shard_id:06d}.npy")
+
+    def _prepare_checkpoint(self) -> set[int]:
+        """
+        Reuse shards from an earlier run over the same corpus; start fresh otherwise.
+        """
+        manifest_path = os.path.join(self.checkpoint_dir, "manifest.json")
+        fingerprint = self._fingerprint()
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            if manifest.get("fingerprint") != fingerprint:
+                shutil.rmtree(self.checkpoint_dir)
+
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        with open(manifest_path, "w") as f:
+            json.dump({"fingerprint": fingerprint, "shards": self.n_shards, "shard_size": self.shard_size}, f)
+        return {i for i in range(self.n_shards) if os.path.exists(self._shard_path(i))}
+
+    def _save_shard(self, shard_id: int, embeddings: np.ndarray):
+        path = self._shard_path(shard_id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.checkpoint_dir, prefix=f"shard_{shard_id:06d}-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, embeddings)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def run(self) -> ShardedEmbeddings:
+        done = self._prepare_checkpoint()
+        todo = [i for i in range(self.n_shards) if i not in done]
+        todo_chunks = sum(len(self.unique_texts[i * self.shard_size:(i + 1) * self.shard_size]) for i in todo)
+        if done:
+            print(f"♻️ Resuming bulk embedding: {len(done)}/{self.n_shards} shards already done.")
+
+        start = time.perf_counter()
+        embedded = 0
+        if todo:
+            workers = min(self.workers, len(todo))
+            threads_per_worker = max(1, CPU_COUNT // workers)
+            print(f"⚡ Embedding {todo_chunks} chunks in {len(todo)} shards with {workers} worker(s)...")
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_encoder,
+                initargs=(self.model_name, threads_per_worker),
+            ) as pool:
+                futures = [
+                    pool.submit(_encode_shard, i, self.unique_texts[i * self.shard_size:(i + 1) * self.shard_size], self.batch_size)
+                    for i in todo
+                ]
+                for future in as_completed(futures):
+                    shard_id, embeddings = future.result()
+                    self._save_shard(shard_id, embeddings)
+                    embedded += len(embeddings)
+                    self.progress(embedded, todo_chunks, time.perf_counter() - start)
+
+        elapsed = time.perf_counter() - start
+        self.stats = {
+            "chunks": len(self.texts),
+            "unique_chunks": len(self.unique_texts),
+            "embedded_chunks": embedded,
+            "resumed_shards": len(done),
+            "workers": self.workers,
+            "seconds": round(elapsed, 3),
+            "chunks_per_s": round(embedded / elapsed, 1) if elapsed and embedded else None,
+        }
+        return ShardedEmbeddings([self._shard_path(i) for i in range(self.n_shards)], self.shard_size, self.rows)
+
+    def cleanup(self):
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+
+
+def print_progress(done: int, total: int, elapsed: float):
+    rate = done / elapsed if elapsed else 0.0
+    eta = (total - done) / rate if rate else float("inf")
+    print(f"⏳ Embedded {done}/{total} chunks ({done / total:.0%}) — {rate:.1f} chunks/s, ETA {eta:.0f}s")
@@ -0,0 +1,125 @@
+# app/chat_session.py
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+SESSION_MAX_ENTRIES = int(os.getenv("CHAT_SESSION_MAX_ENTRIES", "500"))
+SESSION_IDLE_TTL = float(os.getenv("CHAT_SESSION_IDLE_TTL", "1800"))
+SESSION_MAX_CONTEXT_CHUNKS = 20
+SESSION_MAX_TURNS = 20
+
+# Short questions that lean on the previous answer ("and when was it updated?").
+# Demonstratives are left out: "this month" or "that branch" name new criteria.
+FOLLOW_UP_PATTERN = re.compile(
+    r"^\s*(and|also|what about|how about|then)\b"
+    r"|\b(it|its|it's|them|they|their|same)\b",
+    re.IGNORECASE,
+)
+FOLLOW_UP_MAX_WORDS = 12
+
+
+def is_follow_up(query: str) -> bool:
+    if len(query.split()) > FOLLOW_UP_MAX_WORDS:
+        return False
+    return bool(FOLLOW_UP_PATTERN.search(query))
+
+
+class ChatSession:
+    """
+    Server-side state for one conversation.
+    Keeps the last resolved entities and context chunks, plus the provider chat
+    handle so follow-up turns can skip filtering, retrieval and resending context.
+    """
+
+    def __init__(self, chat_id: str):
+        self.chat_id = chat_id
+        self.last_orderno = None
+        self.context_chunks = []
+        self.chat_handle = None
+        self.chat_context_key = None
+        self.chat_turns = 0
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+
+    def remember(self, chunks: list[str], orderno: str | None = None):
+        """
+        Record the context resolved for the latest turn.
+        """
+        self.last_orderno = orderno
+        self.context_chunks = list(chunks[:SESSION_MAX_CONTEXT_CHUNKS])
+
+    def has_context(self) -> bool:
+        return bool(self.context_chunks)
+
+    def bind_chat(self, handle, context_key):
+        self.chat_handle = handle
+        self.chat_context_key = context_key
+        self.chat_turns = 0
+
+    def reset(self):
+        self.last_orderno = None
+        self.context_chunks = []
+        self.chat_handle = None
+        self.chat_context_key = None
+        self.chat_turns = 0
+
+
+class SessionStore:
+    """
+    Bounded LRU of chat sessions keyed by chat id, with idle eviction.
+    """
+
+    def __init__(self, max_entries: int = SESSION_MAX_ENTRIES, idle_ttl: float = SESSION_IDLE_TTL):
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chat_id: str | None) -> ChatSession | None:
+        """
+        Return the session for `chat_id`, creating it if needed.
+        Requests without a chat id get no session.
+        """
+        if not chat_id:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(chat_id)
+            if session is None:
+                session = ChatSession(chat_id)
+                self._sessions[chat_id] = session
+                while len(self._sessions) > self.max_entries:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(chat_id)
+            session.last_seen = now
+            return session
+
+    def drop(self, chat_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(chat_id, None) is not None
+
+    def evict_idle(self) -> int:
+        with self._lock:
+            return self._evict_idle(time.monotonic())
+
+    def _evict_idle(self, now: float) -> int:
+        evicted = 0
+        while self._sessions:
+            chat_id, session = next(iter(self._sessions.items()))
+            if now - session.last_seen <= self.idle_ttl:
+                break
+            del self._sessions[chat_id]
+            evicted += 1
+        return evicted
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+session_store = SessionStore()
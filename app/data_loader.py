@@ -3,8 +3,10 @@
 import json
 from app.vector_store import VectorStore
 from app.utils import chunk_text
+from app.metrics import traced
 
 # === Load pre-cleaned vehicle data and embed ===
+@traced("vehicles.load")
 def load_vehicle_data():
     with open("app/data/vehicles.json", "r", encoding="utf-8") as f:
         vehicles = json.load(f)
@@ -1,6 +1,6 @@
 # app/embedder.py
 
-from sentence_transformers import SentenceTransformer
+import threading
 
 
 class Embedder:
@@ -10,6 +10,8 @@ class Embedder:
     """
 
     def __init__(self, model_name="all-mpnet-base-v2"):
+        from sentence_transformers import SentenceTransformer
+
         self.model = SentenceTransformer(model_name)
 
     def embed(self, texts):
@@ -18,9 +20,24 @@ class Embedder:
         """
         return self.model.encode(texts, convert_to_tensor=True)
 
+    def embed_query(self, text):
+        """
+        Embed a single query as a float32 NumPy vector.
+        """
+        return self.model.encode([text], convert_to_numpy=True)[0]
+
+
+# Optional helper functions (the model is loaded on first use, not on import)
+embedder_instance = None
+_embedder_lock = threading.Lock()
 
-# Optional helper functions
-embedder_instance = Embedder()
+def get_embedder():
+    global embedder_instance
+    if embedder_instance is None:
+        with _embedder_lock:
+            if embedder_instance is None:
+                embedder_instance = Embedder()
+    return embedder_instance
 
 def get_embeddings(texts):
-    return embedder_instance.embed(texts)
+    return get_embedder().embed(texts)
@@ -4,11 +4,14 @@ import os
 import requests
 from dotenv import load_dotenv
 
+from app.metrics import traced
+
 load_dotenv()
 
 BASE_URL = os.getenv("API_BASE_URL")
 API_TOKEN = os.getenv("API_TOKEN")
 
+@traced("telemetry.fetch")
 def get_live_vehicle_data():
     """
     Simulated function to fetch live vehicle data from an external API.
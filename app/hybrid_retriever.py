@@ -0,0 +1,47 @@
+# app/hybrid_retriever.py
+
+from app.lexical_index import tokenize_query, is_identifier_token
+from app.metrics import span
+
+RRF_K = 60
+CANDIDATES_PER_RANKER = 50
+IDENTIFIER_QUERY_RATIO = 0.5
+
+
+class HybridRetriever:
+    """
+    Combines BM25 (exact tokens such as branch names, material codes and plate
+    numbers) with dense vector search using reciprocal rank fusion.
+    Queries made up mostly of identifiers skip embedding and use BM25 alone.
+    """
+
+    def __init__(self, vstore, lexical, embed_query):
+        self.vstore = vstore
+        self.lexical = lexical
+        self.embed_query = embed_query
+
+    def is_identifier_query(self, query: str) -> bool:
+        tokens = tokenize_query(query)
+        if not tokens:
+            return False
+        identifiers = sum(1 for t in tokens if is_identifier_token(t))
+        return identifiers / len(tokens) >= IDENTIFIER_QUERY_RATIO
+
+    def search_ids(self, query: str, top_k: int = 5) -> list[int]:
+        with span("bm25"):
+            lexical_ids = [doc_id for doc_id, _ in self.lexical.search(query, CANDIDATES_PER_RANKER)] if self.lexical else []
+        if self.lexical and self.is_identifier_query(query):
+            return lexical_ids[:top_k]
+
+        with span("embed"):
+            query_embedding = self.embed_query(query)
+        vector_ids = self.vstore.search_ids(query_embedding, CANDIDATES_PER_RANKER)
+
+        fused = {}
+        for ranking in (lexical_ids, vector_ids):
+            for rank, doc_id in enumerate(ranking):
+                fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+        return sorted(fused, key=fused.get, reverse=True)[:top_k]
+
+    def search(self, query: str, top_k: int = 5) -> list[str]:
+        return [self.vstore.text_chunks[i] for i in self.search_ids(query, top_k)]
@@ -0,0 +1,297 @@
+# app/index_snapshot.py
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+SNAPSHOT_MAGIC = b"EAIDXSNP"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ALIGN = 64
+# Off by default: with verification on, every worker hashes the whole file when it opens it
+SNAPSHOT_VERIFY = os.getenv("SNAPSHOT_VERIFY", "0") == "1"
+HASH_BLOCK_SIZE = 16 * 1024 * 1024
+
+# magic, version, section count, chunk count, dim, reserved, sha256 of everything after the header
+HEADER_STRUCT = struct.Struct("<8sIIQII32s")
+# section name, offset, length
+SECTION_STRUCT = struct.Struct("<16sQQ")
+
+EMBEDDINGS_SECTION = "embeddings"
+OFFSETS_SECTION = "chunk_offsets"
+STRINGS_SECTION = "chunk_data"
+META_SECTION = "meta"
+# Per-chunk string columns, one section each: "col.orderno", "col.record_id", ...
+COLUMN_SECTION_PREFIX = "col."
+SECTION_NAME_SIZE = 16
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class ChunkTable:
+    """
+    Read-only sequence of chunk strings decoded on access from the snapshot's
+    string table, so workers never hold a private copy of every chunk.
+    """
+
+    def __init__(self, buffer, offsets: np.ndarray, base: int):
+        self._buffer = buffer
+        self._offsets = offsets
+        self._base = base
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        start = self._base + int(self._offsets[index])
+        end = self._base + int(self._offsets[index + 1])
+        return bytes(self._buffer[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class StringColumn(ChunkTable):
+    """
+    A per-chunk metadata column decoded on access from its snapshot section.
+    Missing values are None.
+
+    Section layout: uint64 row count, uint64 offsets (count + 1), uint8 null
+    flags (count, padded to 8 bytes), then the UTF-8 string data.
+    """
+
+    def __init__(self, buffer, offset: int):
+        (count,) = struct.unpack_from("<Q", buffer, offset)
+        offsets = np.frombuffer(buffer, dtype=np.uint64, count=count + 1, offset=offset + 8)
+        nulls_offset = offset + 8 * (count + 2)
+        super().__init__(buffer, offsets, nulls_offset + _align8(count))
+        self._nulls = np.frombuffer(buffer, dtype=np.uint8, count=count, offset=nulls_offset)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if 0 <= index < len(self) and self._nulls[index]:
+            return None
+        return super().__getitem__(index)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+
+def encode_string_column(values) -> bytes:
+    values = list(values)
+    encoded = [b"" if v is None else str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.uint64)
+    nulls = np.array([v is None for v in values], dtype=np.uint8).tobytes()
+    return b"".join([
+        struct.pack("<Q", len(values)),
+        offsets.tobytes(),
+        nulls + bytes(_align8(len(nulls)) - len(nulls)),
+        *encoded,
+    ])
+
+
+class IndexSnapshot:
+    """
+    A memory-mapped, read-only view of a snapshot file.
+    Embeddings are a NumPy view straight onto the mapping, so every worker
+    that opens the same file shares one copy through the page cache.
+    """
+
+    def __init__(self, path: str, verify: bool = SNAPSHOT_VERIFY):
+        self.path = path
+        if os.path.getsize(path) < HEADER_STRUCT.size:
+            raise SnapshotError(f"❌ Snapshot {path} is truncated.")
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n_sections, n_chunks, dim, _, checksum = HEADER_STRUCT.unpack_from(self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotError(f"❌ {path} is not an index snapshot.")
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"❌ Unsupported snapshot version {version} (expected {SNAPSHOT_VERSION}).")
+        if verify and _sha256(memoryview(self._mmap)[HEADER_STRUCT.size:]) != checksum:
+            raise SnapshotError(f"❌ Snapshot {path} failed checksum verification.")
+
+        self.version = version
+        self.n_chunks = n_chunks
+        self.dim = dim
+        self.sections = {}
+        for i in range(n_sections):
+            name, offset, length = SECTION_STRUCT.unpack_from(self._mmap, HEADER_STRUCT.size + i * SECTION_STRUCT.size)
+            if offset + length > len(self._mmap):
+                raise SnapshotError(f"❌ Snapshot {path} is truncated.")
+            self.sections[name.rstrip(b"\0").decode("ascii")] = (offset, length)
+
+        offset, _ = self.sections[EMBEDDINGS_SECTION]
+        self.embeddings = np.frombuffer(self._mmap, dtype=np.float32, count=n_chunks * dim, offset=offset).reshape(n_chunks, dim)
+
+        offset, _ = self.sections[OFFSETS_SECTION]
+        chunk_offsets = np.frombuffer(self._mmap, dtype=np.uint64, count=n_chunks + 1, offset=offset)
+        self.chunks = ChunkTable(self._mmap, chunk_offsets, self.sections[STRINGS_SECTION][0])
+
+        self.meta = json.loads(self.section_bytes(META_SECTION) or b"{}")
+        # Older snapshots kept the columns as JSON lists in the meta section
+        self._columns = dict(self.meta.pop("columns", {}))
+        for name, (offset, _) in self.sections.items():
+            if name.startswith(COLUMN_SECTION_PREFIX):
+                self._columns[name[len(COLUMN_SECTION_PREFIX):]] = StringColumn(self._mmap, offset)
+
+    def section_bytes(self, name: str) -> bytes | None:
+        if name not in self.sections:
+            return None
+        offset, length = self.sections[name]
+        return self._mmap[offset:offset + length]
+
+    def section_view(self, name: str) -> memoryview | None:
+        if name not in self.sections:
+            return None
+        offset, length = self.sections[name]
+        return memoryview(self._mmap)[offset:offset + length]
+
+    @property
+    def columns(self) -> dict:
+        return self._columns
+
+    def age_seconds(self) -> float:
+        return time.time() - self.meta.get("created_at", os.path.getmtime(self.path))
+
+
+def _align(n: int) -> int:
+    return (n + SNAPSHOT_ALIGN - 1) // SNAPSHOT_ALIGN * SNAPSHOT_ALIGN
+
+
+def _align8(n: int) -> int:
+    return (n + 7) // 8 * 8
+
+
+def _sha256(view) -> bytes:
+    digest = hashlib.sha256()
+    for start in range(0, len(view), HASH_BLOCK_SIZE):
+        digest.update(view[start:start + HASH_BLOCK_SIZE])
+    return digest.digest()
+
+
+class _LazyBytes:
+    """
+    A section made of several buffers (or a generator of them) with a known total length.
+    """
+
+    def __init__(self, parts, length: int):
+        self.parts = parts
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+
+def _float32_bytes(block) -> memoryview:
+    return memoryview(np.ascontiguousarray(block, dtype=np.float32)).cast("B")
+
+
+def write_snapshot(path: str, embeddings, chunks, columns: dict = None, meta: dict = None,
+                   extra_sections: dict = None) -> str:
+    """
+    Atomically write embeddings, chunk strings and metadata columns to `path`.
+    The file is written to a temp file in the same directory and renamed over
+    the target, so readers only ever see a complete snapshot.
+    """
+    if hasattr(embeddings, "iter_blocks"):
+        # Block sources (e.g. sharded bulk-embedding output) are streamed into the file
+        shape = embeddings.shape
+        embedding_data = (_float32_bytes(block) for block in embeddings.iter_blocks())
+    else:
+        embeddings = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        shape = embeddings.shape
+        embedding_data = [memoryview(embeddings).cast("B")]
+    if len(shape) != 2 or shape[0] != len(chunks):
+        raise SnapshotError("❌ Embeddings and chunks must have matching lengths.")
+
+    encoded = [c.encode("utf-8") for c in chunks]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.uint64)
+
+    meta = dict(meta or {})
+    meta.setdefault("created_at", time.time())
+
+    sections = [
+        (EMBEDDINGS_SECTION, _LazyBytes(embedding_data, shape[0] * shape[1] * 4)),
+        (OFFSETS_SECTION, offsets.tobytes()),
+        (STRINGS_SECTION, b"".join(encoded)),
+        (META_SECTION, json.dumps(meta, ensure_ascii=False, default=str).encode("utf-8")),
+    ]
+    # Columns are binary sections rather than meta JSON, so opening a snapshot never parses them
+    for name, values in (columns or {}).items():
+        if len(values) != shape[0]:
+            raise SnapshotError(f"❌ Column '{name}' must have one value per chunk.")
+        sections.append((f"{COLUMN_SECTION_PREFIX}{name}", encode_string_column(values)))
+    sections.extend((extra_sections or {}).items())
+    for name, _ in sections:
+        if len(name.encode("ascii")) > SECTION_NAME_SIZE:
+            raise SnapshotError(f"❌ Section name '{name}' is longer than {SECTION_NAME_SIZE} bytes.")
+
+    table_end = HEADER_STRUCT.size + SECTION_STRUCT.size * len(sections)
+    table = bytearray()
+    cursor = _align(table_end)
+    for name, data in sections:
+        table += SECTION_STRUCT.pack(name.encode("ascii"), cursor, len(data))
+        cursor = _align(cursor + len(data))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            # Sections are streamed after a placeholder header; the checksum is
+            # filled in once the body has been hashed.
+            digest = hashlib.sha256()
+
+            def write_body(data):
+                digest.update(data)
+                f.write(data)
+
+            f.write(bytes(HEADER_STRUCT.size))
+            write_body(table)
+            position = table_end
+            for _, data in sections:
+                write_body(bytes(_align(position) - position))
+                for part in (data.parts if isinstance(data, _LazyBytes) else [data]):
+                    write_body(part)
+                position = _align(position) + len(data)
+            write_body(bytes(_align(position) - position))
+
+            f.seek(0)
+            f.write(HEADER_STRUCT.pack(
+                SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(sections), shape[0],
+                shape[1], 0, digest.digest(),
+            ))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def load_snapshot(path: str, verify: bool = SNAPSHOT_VERIFY) -> IndexSnapshot:
+    return IndexSnapshot(path, verify=verify)
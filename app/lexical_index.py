@@ -0,0 +1,172 @@
+# app/lexical_index.py
+
+import json
+import re
+import struct
+
+import numpy as np
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "for", "to", "in", "on", "at", "by", "with",
+    "from", "is", "are", "was", "were", "be", "me", "my", "show", "list", "all", "any",
+    "what", "which", "who", "when", "where", "how", "order", "orders", "please", "find",
+}
+_ALIGN = 8
+
+
+def tokenize_chunk(text: str) -> list[str]:
+    """
+    Tokenize the field values of a "key: value || key: value" chunk; field names
+    are left out since every chunk shares them.
+    """
+    tokens = []
+    for part in text.split("||"):
+        value = part.split(":", 1)[1] if ":" in part else part
+        tokens.extend(TOKEN_PATTERN.findall(value.lower()))
+    return tokens
+
+
+def tokenize_query(query: str) -> list[str]:
+    return [t for t in TOKEN_PATTERN.findall(query.lower()) if t not in STOPWORDS]
+
+
+def is_identifier_token(token: str) -> bool:
+    return any(c.isdigit() for c in token)
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over chunk tokens, stored as CSR arrays
+    (per-term offsets into flat doc id / term frequency arrays). It serializes
+    into an index snapshot section and can be loaded from it without copying.
+    """
+
+    def __init__(self, vocab: list[str], offsets: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray, doc_lens: np.ndarray):
+        self.vocab = vocab
+        self.term_ids = {term: i for i, term in enumerate(vocab)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lens = doc_lens
+        self.n_docs = len(doc_lens)
+        self.avgdl = float(doc_lens.mean()) if self.n_docs else 0.0
+
+    @classmethod
+    def build(cls, texts, start_doc: int = 0) -> "BM25Index":
+        postings = {}
+        doc_lens = []
+        for doc_id, text in enumerate(texts, start=start_doc):
+            tokens = tokenize_chunk(text)
+            doc_lens.append(len(tokens))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((doc_id, tf))
+        return cls._from_postings(postings, np.asarray(doc_lens, dtype=np.uint32))
+
+    @classmethod
+    def _from_postings(cls, postings: dict, doc_lens: np.ndarray) -> "BM25Index":
+        vocab = sorted(postings)
+        offsets = np.zeros(len(vocab) + 1, dtype=np.uint64)
+        doc_ids, tfs = [], []
+        for i, term in enumerate(vocab):
+            entries = postings[term]
+            doc_ids.extend(d for d, _ in entries)
+            tfs.extend(tf for _, tf in entries)
+            offsets[i + 1] = offsets[i] + len(entries)
+        return cls(
+            vocab, offsets,
+            np.asarray(doc_ids, dtype=np.uint32), np.minimum(np.asarray(tfs, dtype=np.int64), 65535).astype(np.uint16),
+            doc_lens,
+        )
+
+    def postings(self, term: str):
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return None, None
+        start, end = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+        return self.doc_ids[start:end], self.tfs[start:end]
+
+    def apply(self, keep: list[int], new_texts: list[str]) -> "BM25Index":
+        """
+        Return an index over the kept documents (renumbered in `keep` order)
+        followed by `new_texts`; only the new texts are tokenized.
+        """
+        remap = np.full(self.n_docs, -1, dtype=np.int64)
+        remap[np.asarray(keep, dtype=np.int64)] = np.arange(len(keep))
+
+        postings = {}
+        for term_id, term in enumerate(self.vocab):
+            start, end = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+            new_ids = remap[self.doc_ids[start:end]]
+            mask = new_ids >= 0
+            if mask.any():
+                postings[term] = list(zip(new_ids[mask].tolist(), self.tfs[start:end][mask].tolist()))
+
+        added = BM25Index.build(new_texts, start_doc=len(keep))
+        for term in added.vocab:
+            ids, tfs = added.postings(term)
+            postings.setdefault(term, []).extend(zip(ids.tolist(), tfs.tolist()))
+
+        doc_lens = np.concatenate([self.doc_lens[np.asarray(keep, dtype=np.int64)], added.doc_lens]).astype(np.uint32)
+        return BM25Index._from_postings(postings, doc_lens)
+
+    def search(self, query: str, top_k: int = 10) -> list[tuple[int, float]]:
+        """
+        Return (doc id, score) pairs for the best-matching chunks.
+        """
+        tokens = tokenize_query(query)
+        if not tokens or not self.n_docs:
+            return []
+
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lens / (self.avgdl or 1.0))
+        for token in set(tokens):
+            ids, tfs = self.postings(token)
+            if ids is None or not len(ids):
+                continue
+            idf = np.log(1 + (self.n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            tf = tfs.astype(np.float32)
+            scores[ids] += idf * tf * (BM25_K1 + 1) / (tf + norm[ids])
+
+        hits = np.flatnonzero(scores)
+        if not len(hits):
+            return []
+        if len(hits) > top_k:
+            hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(i), float(scores[i])) for i in hits]
+
+    def to_bytes(self) -> bytes:
+        arrays = [("offsets", self.offsets), ("doc_ids", self.doc_ids), ("tfs", self.tfs), ("doc_lens", self.doc_lens)]
+        layout = {}
+        position = 0
+        for name, arr in arrays:
+            layout[name] = [position, arr.dtype.str, len(arr)]
+            position += (arr.nbytes + _ALIGN - 1) // _ALIGN * _ALIGN
+        header = json.dumps({"vocab": self.vocab, "arrays": layout}).encode("utf-8")
+        header += b" " * (-(len(header) + 8) % _ALIGN)
+
+        out = bytearray(struct.pack("<Q", len(header)) + header)
+        for _, arr in arrays:
+            out += arr.tobytes()
+            out += bytes(-arr.nbytes % _ALIGN)
+        return bytes(out)
+
+    @classmethod
+    def from_buffer(cls, buffer) -> "BM25Index":
+        """
+        Load from `to_bytes` output; arrays are views onto `buffer` (e.g. an mmap).
+        """
+        (header_len,) = struct.unpack_from("<Q", buffer, 0)
+        header = json.loads(bytes(buffer[8:8 + header_len]))
+        base = 8 + header_len
+        arrays = {
+            name: np.frombuffer(buffer, dtype=np.dtype(dtype), count=count, offset=base + offset)
+            for name, (offset, dtype, count) in header["arrays"].items()
+        }
+        return cls(header["vocab"], arrays["offsets"], arrays["doc_ids"], arrays["tfs"], arrays["doc_lens"])
@@ -2,13 +2,12 @@
 
 import os
 import re
-import subprocess
+import threading
 from dotenv import load_dotenv
 
-import google.generativeai as genai
-import whisper
-
 from app.order_formatter import format_order_record
+from app.chat_session import SESSION_MAX_TURNS
+from app.metrics import metrics, span
 
 # === Load environment variables ===
 load_dotenv()
@@ -18,60 +17,43 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise ValueError("❌ Missing GEMINI_API_KEY in .env")
 
-genai.configure(api_key=GEMINI_API_KEY, transport="rest")
-gemini_model = genai.GenerativeModel("models/gemini-2.5-flash-preview-05-20")
+GEMINI_MODEL_NAME = "models/gemini-2.5-flash-preview-05-20"
 
-# === Whisper Voice Transcription (lazy-load) ===
-_whisper_model = None
+# The SDK is imported and configured on first use to keep it out of startup
+gemini_model = None
+_gemini_lock = threading.Lock()
 
-def get_whisper_model(model_name: str = "small"):
-    global _whisper_model
-    if _whisper_model is None:
-        print(f"🔊 Loading Whisper model: {model_name}")
-        _whisper_model = whisper.load_model(model_name)
-    return _whisper_model
+def get_gemini_model():
+    global gemini_model
+    if gemini_model is None:
+        with _gemini_lock:
+            if gemini_model is None:
+                import google.generativeai as genai
 
-def convert_webm_to_wav(webm_path: str) -> str:
-    wav_path = webm_path.replace(".webm", ".wav")
-    try:
-        subprocess.run(["ffmpeg", "-y", "-i", webm_path, wav_path], check=True, capture_output=True)
-        return wav_path
-    except subprocess.CalledProcessError as e:
-        print("❌ FFmpeg conversion error:", e.stderr.decode())
-        raise RuntimeError("Audio conversion failed.")
-
-def transcribe_audio(file_path: str) -> str:
-    if file_path.endswith(".webm"):
-        file_path = convert_webm_to_wav(file_path)
-    model = get_whisper_model()
-    result = model.transcribe(file_path)
-    return result["text"].strip()
-
-def handle_voice_query(audio_path: str, provider: str = "gemini") -> str:
-    try:
-        query = transcribe_audio(audio_path)
-        if not query:
-            return "⚠️ Unable to understand audio clearly."
-        return run_llm_query(query, provider=provider)
-    except Exception as e:
-        return f"❌ Voice query failed: {str(e)}"
+                genai.configure(api_key=GEMINI_API_KEY, transport="rest")
+                gemini_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+    return gemini_model
+
+# === Voice queries ===
+def answer_voice_transcript(query: str, provider: str = "gemini") -> str:
+    if not query:
+        return "⚠️ Unable to understand audio clearly."
+    return run_llm_query(query, provider=provider)
 
 # === LLM Unified Entry Point ===
-def run_llm_query(query: str, context_chunks: list = None, provider: str = "gemini") -> str:
-    if provider == "gemini":
-        return _run_with_gemini(query, context_chunks)
-    elif provider == "openai":
-        return _run_with_openai(query, context_chunks)
-    elif provider == "local":
-        return _run_with_local_model(query, context_chunks)
-    else:
-        return f"❌ Unknown LLM provider: '{provider}'"
+def run_llm_query(query: str, context_chunks: list = None, provider: str = "gemini", session=None) -> str:
+    with span("llm"):
+        if provider == "gemini":
+            return _run_with_gemini(query, context_chunks, session)
+        elif provider == "openai":
+            return _run_with_openai(query, context_chunks)
+        elif provider == "local":
+            return _run_with_local_model(query, context_chunks)
+        else:
+            return f"❌ Unknown LLM provider: '{provider}'"
 
 # === Gemini Backend ===
-def _run_with_gemini(query: str, context_chunks: list = None) -> str:
-    if not context_chunks:
-        return _run_gemini_prompt(query)
-
+def _build_context_prompt(query: str, context_chunks: list) -> str:
     records = []
     for chunk in context_chunks:
         rec = {}
@@ -83,7 +65,7 @@ def _run_with_gemini(query: str, context_chunks: list = None) -> str:
 
     context_str = "\n\n".join([format_order_record(r) for r in records])
 
-    prompt = f"""
+    return f"""
 You are an assistant summarizing order data.
 
 Instructions:
@@ -98,16 +80,47 @@ Query:
 {query}
 """.strip()
 
+def _send_in_session(session, query: str, context_chunks: list):
+    # Reuse the session's chat while the context is unchanged so follow-ups
+    # only send the new question instead of the whole context again.
+    context_key = hash(tuple(context_chunks))
+    with session.lock:
+        reuse = (session.chat_handle is not None and session.chat_context_key == context_key
+                 and session.chat_turns < SESSION_MAX_TURNS)
+        metrics.record_cache("llm_chat", reuse)
+        if not reuse:
+            session.bind_chat(get_gemini_model().start_chat(), context_key)
+            with span("llm.prompt"):
+                message = _build_context_prompt(query, context_chunks)
+        else:
+            message = f"Follow-up query about the same context:\n{query}"
+        try:
+            response = session.chat_handle.send_message(message)
+        except Exception:
+            session.bind_chat(None, None)
+            raise
+        session.chat_turns += 1
+        return response
+
+def _run_with_gemini(query: str, context_chunks: list = None, session=None) -> str:
+    if not context_chunks:
+        return _run_gemini_prompt(query)
+
     try:
-        chat = gemini_model.start_chat()
-        response = chat.send_message(prompt)
+        if session is not None:
+            response = _send_in_session(session, query, context_chunks)
+        else:
+            chat = get_gemini_model().start_chat()
+            with span("llm.prompt"):
+                message = _build_context_prompt(query, context_chunks)
+            response = chat.send_message(message)
         return response.text.strip().replace("*", "").replace("\\", "").replace("\n", " ")
     except Exception as e:
         return f"❌ Gemini API error: {str(e)}"
 
 def _run_gemini_prompt(prompt: str) -> str:
     try:
-        response = gemini_model.generate_content(prompt)
+        response = get_gemini_model().generate_content(prompt)
         return response.text.strip()
     except Exception as e:
         return f"❌ Gemini free-form prompt failed: {str(e)}"
@@ -137,7 +150,7 @@ Title:
 """
     if provider == "gemini":
         try:
-            chat = gemini_model.start_chat()
+            chat = get_gemini_model().start_chat()
             response = chat.send_message(prompt)
             return response.text.strip()
         except Exception:
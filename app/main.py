@@ -1,20 +1,30 @@
 # app/main.py
 
+from app.startup import startup_profile
+
 from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from tempfile import NamedTemporaryFile
 from contextlib import asynccontextmanager
 from datetime import datetime
-import shutil
-import os
+import asyncio
+import json
+import threading
 
 from app.data_loader import load_vehicle_data
-from app.llm_wrapper import run_llm_query, generate_title_from_model, handle_voice_query
-from app.order_loader import dump_orders_to_json
+from app.llm_wrapper import run_llm_query, answer_voice_transcript
+from app.order_loader import sync_orders
+from app.order_db import get_order_source
 from app.order_vector import build_order_index
 from app.rag_engine import RAGEngine
+from app.chat_session import session_store
+from app.title_generator import request_title, get_title
+from app.transcriber import transcription_pool, TranscriptionQueueFull
+from app.metrics import metrics, RequestTimingMiddleware
+
+startup_profile.mark("imports")
 
 
 def custom_serializer(obj):
@@ -30,23 +40,74 @@ item_chunks = []
 order_rag = None
 order_chunks = []
 
+# Serializes the startup vehicle load and /refresh so they never race over the globals above
+vehicle_lock = threading.Lock()
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    global rag, raw_items, item_chunks, order_rag, order_chunks
 
-    print("⏳ Loading data...")
+def init_vehicle_pipeline():
+    global rag, raw_items, item_chunks
+    with vehicle_lock, startup_profile.phase("vehicles.load"):
+        rag, raw_items, item_chunks = load_vehicle_data()
 
-    rag, raw_items, item_chunks = load_vehicle_data()
 
-    dump_orders_to_json()
-    order_rag = RAGEngine()
-    order_store, order_chunks = build_order_index()
+def init_order_pipeline():
+    global order_rag, order_chunks
+    with startup_profile.phase("orders.sync"):
+        orders, diff = sync_orders(source=get_order_source())
+    print(f"🔄 Loaded {len(orders)} orders ({diff.summary()}).")
+    with startup_profile.phase("orders.index"):
+        order_store, chunks, lexical = build_order_index(orders=orders, diff=diff)
     print("📦 Loading order chunks into vector store...")
-    order_rag.vstore = order_store
-    order_rag.is_loaded = True
-    print("✅ RAG systems initialized.")
+    engine = RAGEngine()
+    engine.vstore = order_store
+    engine.text_chunks = chunks
+    engine.raw_orders = orders
+    engine.attach_lexical_index(lexical)
+    with startup_profile.phase("orders.embedder"):
+        # Part of the orders component, so /readyz waits for the query embedder too
+        engine.warm_up()
+    engine.is_loaded = True
+    order_chunks = chunks
+    order_rag = engine
+
+
+def init_transcription():
+    with startup_profile.phase("transcription.warmup"):
+        transcription_pool.start()
+
+
+async def run_component(name: str, init):
+    startup_profile.set_component(name, "loading")
+    try:
+        await asyncio.to_thread(init)
+        startup_profile.set_component(name, "ready")
+    except Exception as e:
+        print(f"❌ Failed to initialize {name}: {e}")
+        startup_profile.set_component(name, f"failed: {e}")
+
+
+async def initialize():
+    print("⏳ Loading data...")
+    with startup_profile.phase("init.total"):
+        await asyncio.gather(
+            run_component("vehicles", init_vehicle_pipeline),
+            run_component("orders", init_order_pipeline),
+            run_component("transcription", init_transcription),
+        )
+    if startup_profile.is_ready():
+        print("✅ RAG systems initialized.")
+    startup_profile.report()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Accept traffic right away; /readyz reports when the pipelines are loaded
+    for name in ("vehicles", "orders", "transcription"):
+        startup_profile.set_component(name, "pending")
+    init_task = asyncio.create_task(initialize())
     yield
+    init_task.cancel()
+    transcription_pool.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -57,11 +118,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+metrics.set_gauge("chat_sessions", "Active server-side chat sessions.", lambda: len(session_store))
+metrics.set_gauge("transcription_pending", "Voice transcriptions queued or running.", lambda: transcription_pool.pending)
+
+if metrics.enabled:
+    app.add_middleware(RequestTimingMiddleware)
+
 
 class QueryInput(BaseModel):
     query: str
+    chat_id: str | None = None
 
 class QueryOutput(BaseModel):
     response: list[str]
@@ -71,12 +140,34 @@ class TitleRequest(BaseModel):
 
 class TitleResponse(BaseModel):
     title: str
+    title_id: str | None = None
+    final: bool = True
+
+
+@app.get("/healthz")
+def liveness():
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+def readiness():
+    ready = startup_profile.is_ready()
+    content = {"status": "ready" if ready else "starting", **startup_profile.as_dict()}
+    return JSONResponse(status_code=200 if ready else 503, content=content)
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.post("/chat", response_model=QueryOutput)
 def chat(user_input: QueryInput):
     global rag, raw_items, item_chunks
-    response = run_llm_query(user_input.query, item_chunks)
+    if startup_profile.components.get("vehicles") != "ready":
+        return {"response": ["⚠️ Vehicle data not loaded yet."]}
+    session = session_store.get(user_input.chat_id)
+    response = run_llm_query(user_input.query, item_chunks, session=session)
     return {"response": [response]}
 
 
@@ -85,42 +176,95 @@ def chat_order(user_input: QueryInput):
     global order_rag, order_chunks
     if not order_rag:
         return {"response": ["⚠️ Order module not loaded yet."]}
-    response = order_rag.query(user_input.query)
+    session = session_store.get(user_input.chat_id)
+    response = order_rag.query(user_input.query, session=session)
     if not response:
         response = ["No matching records found."]
     return {"response": response}
 
 
+@app.delete("/session/{chat_id}")
+def end_session(chat_id: str):
+    return {"status": "cleared" if session_store.drop(chat_id) else "not_found"}
+
+
 @app.post("/generate_title", response_model=TitleResponse)
 def generate_title(data: TitleRequest):
-    title = generate_title_from_model(data.message)
-    return {"title": title}
+    return request_title(data.message)
+
+
+@app.get("/generate_title/{title_id}", response_model=TitleResponse)
+def poll_title(title_id: str):
+    result = get_title(title_id)
+    if result is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown title id."})
+    return result
 
 
 @app.post("/voice-query")
 async def voice_query(file: UploadFile = File(...)):
-    temp_path = None
     try:
         if not file.content_type.startswith("audio/"):
             return JSONResponse(status_code=400, content={"error": "Invalid file type."})
 
-        with NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
-            shutil.copyfileobj(file.file, temp_file)
-            temp_path = temp_file.name
-
-        answer = handle_voice_query(temp_path)
+        audio = await file.read()
+        query = await transcription_pool.transcribe(audio)
+        answer = await run_in_threadpool(answer_voice_transcript, query)
         return {"response": answer}
 
+    except TranscriptionQueueFull as e:
+        return JSONResponse(status_code=503, content={"error": f"⏳ {str(e)}"}, headers={"Retry-After": "2"})
+
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": f"❌ Voice query failed: {str(e)}"})
 
-    finally:
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
+
+@app.post("/voice-query/stream")
+async def voice_query_stream(file: UploadFile = File(...)):
+    """
+    Stream newline-delimited JSON events: `partial` transcripts as each speech
+    segment finishes, a `route` event as soon as an order number is heard,
+    then the final `answer`.
+    """
+    if not file.content_type.startswith("audio/"):
+        return JSONResponse(status_code=400, content={"error": "Invalid file type."})
+    if transcription_pool.pending >= transcription_pool.max_pending:
+        return JSONResponse(status_code=503, content={"error": "⏳ Transcription queue is full, try again shortly."}, headers={"Retry-After": "2"})
+
+    audio = await file.read()
+
+    async def events():
+        transcript = ""
+        routed_orderno = None
+        try:
+            async for partial in transcription_pool.transcribe_stream(audio):
+                transcript = partial["transcript"]
+                yield json.dumps({"type": "partial", **partial}) + "\n"
+                if routed_orderno is None and order_rag:
+                    routed_orderno = order_rag.extract_orderno(transcript)
+                    if routed_orderno:
+                        yield json.dumps({"type": "route", "module": "order", "orderno": routed_orderno}) + "\n"
+
+            if routed_orderno:
+                answer = "\n".join(await run_in_threadpool(order_rag.query, transcript))
+            else:
+                answer = await run_in_threadpool(answer_voice_transcript, transcript)
+            yield json.dumps({"type": "answer", "transcript": transcript, "response": answer}) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "error": f"❌ Voice query failed: {str(e)}"}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
 
 
 @app.post("/refresh")
 def refresh_data():
     global rag, raw_items, item_chunks
-    rag, raw_items, item_chunks = load_vehicle_data()
+    if not vehicle_lock.acquire(blocking=False):
+        return JSONResponse(status_code=503, content={"error": "⏳ Vehicle data is already loading, try again shortly."}, headers={"Retry-After": "2"})
+    try:
+        rag, raw_items, item_chunks = load_vehicle_data()
+    finally:
+        vehicle_lock.release()
+    # A successful refresh also recovers from a failed startup load
+    startup_profile.set_component("vehicles", "ready")
     return {"status": "refreshed", "total_items": len(raw_items)}
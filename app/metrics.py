@@ -0,0 +1,263 @@
+# app/metrics.py
+
+import os
+import threading
+from bisect import bisect_left
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from functools import wraps
+
+# Spans, counters and the timing middleware only run when this is set
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0").lower() in ("1", "true", "yes")
+METRICS_PREFIX = "assistant"
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NOOP_SPAN = nullcontext()
+_current_trace = ContextVar("request_trace", default=None)
+
+
+class Histogram:
+    """
+    Cumulative Prometheus-style histogram over fixed upper bounds (seconds).
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestTrace:
+    """
+    Per-request stage durations; nested or repeated stages accumulate.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.stages = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self, total: float) -> str:
+        parts = [f"{stage.replace('.', '-')};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items()]
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+class _Span:
+    __slots__ = ("registry", "stage", "start")
+
+    def __init__(self, registry, stage: str):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe_stage(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """
+    In-process metrics exported in the Prometheus text format: stage and HTTP
+    latency histograms, cache hit/miss counters, and gauges read at scrape time.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self.stage_latency = {}
+        self.http_latency = {}
+        self.cache_requests = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    # === Recording ===
+    def span(self, stage: str):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, stage)
+
+    def observe_stage(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self.stage_latency.get(stage)
+            if histogram is None:
+                histogram = self.stage_latency[stage] = Histogram()
+            histogram.observe(seconds)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(stage, seconds)
+
+    def observe_request(self, method: str, path: str, status: int, seconds: float):
+        key = (method, path, str(status))
+        with self._lock:
+            histogram = self.http_latency.get(key)
+            if histogram is None:
+                histogram = self.http_latency[key] = Histogram()
+            histogram.observe(seconds)
+
+    def record_cache(self, cache: str, hit: bool):
+        if not self.enabled:
+            return
+        key = (cache, "hit" if hit else "miss")
+        with self._lock:
+            self.cache_requests[key] = self.cache_requests.get(key, 0) + 1
+
+    def set_gauge(self, name: str, help_text: str, read, **labels):
+        """
+        Register (or replace) a gauge whose value is read by calling `read()` at scrape time.
+        """
+        with self._lock:
+            self.gauges.setdefault(name, {"help": help_text, "series": {}})["series"][tuple(sorted(labels.items()))] = read
+
+    def start_trace(self):
+        trace = RequestTrace()
+        return trace, _current_trace.set(trace)
+
+    def end_trace(self, token):
+        _current_trace.reset(token)
+
+    # === Exposition ===
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            stage_latency = {k: _copy(h) for k, h in self.stage_latency.items()}
+            http_latency = {k: _copy(h) for k, h in self.http_latency.items()}
+            cache_requests = dict(self.cache_requests)
+            gauges = {name: (g["help"], dict(g["series"])) for name, g in self.gauges.items()}
+
+        name = f"{METRICS_PREFIX}_stage_duration_seconds"
+        lines += [f"# HELP {name} Time spent in each request stage.", f"# TYPE {name} histogram"]
+        for stage, histogram in sorted(stage_latency.items()):
+            lines += _histogram_lines(name, histogram, {"stage": stage})
+
+        name = f"{METRICS_PREFIX}_http_request_duration_seconds"
+        lines += [f"# HELP {name} HTTP request latency.", f"# TYPE {name} histogram"]
+        for (method, path, status), histogram in sorted(http_latency.items()):
+            lines += _histogram_lines(name, histogram, {"method": method, "path": path, "status": status})
+
+        name = f"{METRICS_PREFIX}_cache_requests_total"
+        lines += [f"# HELP {name} Cache lookups by result.", f"# TYPE {name} counter"]
+        for (cache, result), count in sorted(cache_requests.items()):
+            lines.append(f"{name}{_labels({'cache': cache, 'result': result})} {count}")
+
+        name = f"{METRICS_PREFIX}_cache_hit_ratio"
+        lines += [f"# HELP {name} Share of cache lookups that hit.", f"# TYPE {name} gauge"]
+        for cache in sorted({cache for cache, _ in cache_requests}):
+            hits = cache_requests.get((cache, "hit"), 0)
+            total = hits + cache_requests.get((cache, "miss"), 0)
+            lines.append(f"{name}{_labels({'cache': cache})} {hits / total if total else 0.0:.6f}")
+
+        for gauge, (help_text, series) in sorted(gauges.items()):
+            name = f"{METRICS_PREFIX}_{gauge}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for labels, read in sorted(series.items()):
+                try:
+                    value = float(read())
+                except Exception:
+                    continue
+                lines.append(f"{name}{_labels(dict(labels))} {value!r}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _copy(histogram: Histogram) -> Histogram:
+    copy = Histogram(histogram.buckets)
+    copy.counts = list(histogram.counts)
+    copy.sum = histogram.sum
+    copy.count = histogram.count
+    return copy
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, histogram: Histogram, labels: dict) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': f'{bound:g}'})} {cumulative}")
+    lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+    lines.append(f"{name}_sum{_labels(labels)} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+    return lines
+
+
+metrics = MetricsRegistry()
+
+
+class RequestTimingMiddleware:
+    """
+    ASGI middleware that traces each HTTP request, records its latency by route
+    template and returns the stage breakdown in a `Server-Timing` header.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace, token = self.registry.start_trace()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = trace.server_timing(time.perf_counter() - trace.started_at)
+                message["headers"] = [*message.get("headers", []), (b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            self.registry.end_trace(token)
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            self.registry.observe_request(scope["method"], path, status, time.perf_counter() - trace.started_at)
+
+
+def span(stage: str):
+    """
+    Time a block as `stage`; a shared no-op context when metrics are disabled.
+    """
+    return metrics.span(stage)
+
+
+def traced(stage: str):
+    """
+    Decorator form of `span`; leaves the function untouched when metrics are disabled.
+    """
+    def decorator(fn):
+        if not metrics.enabled:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with metrics.span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,159 @@
+# app/order_db.py
+
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ORDER_SOURCE = os.getenv("ORDER_SOURCE", "json")
+ORDER_TABLE = os.getenv("ORDER_TABLE", "orders")
+ORDER_WATERMARK_COLUMN = "updated_at"
+DB_FETCH_BATCH_SIZE = int(os.getenv("DB_FETCH_BATCH_SIZE", "10000"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+
+
+class ConnectionPool:
+    """
+    Minimal thread-safe pool around any DB-API `connect` callable.
+    Connections are created on demand up to `max_size` and reused afterwards.
+    """
+
+    def __init__(self, connect, max_size: int = DB_POOL_SIZE):
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            ok = False
+            try:
+                yield conn
+                conn.commit()
+                ok = True
+            finally:
+                if not ok:
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        conn.close()
+                        conn = None
+                if conn is not None:
+                    self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def normalize_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+class OrderDatabaseSource:
+    """
+    Streams order rows from PostgreSQL (or any DB-API database, e.g. SQLite in
+    benchmarks) in large fetch batches, optionally only rows updated since a
+    watermark. On PostgreSQL a named server-side cursor is used so the result
+    set is never materialized on the client.
+    """
+
+    def __init__(self, connect, table: str = ORDER_TABLE, batch_size: int = DB_FETCH_BATCH_SIZE,
+                 pool_size: int = DB_POOL_SIZE, paramstyle: str = "format", server_side: bool = True):
+        self.pool = ConnectionPool(connect, max_size=pool_size)
+        self.table = table
+        self.batch_size = batch_size
+        self.placeholder = "%s" if paramstyle in ("format", "pyformat") else "?"
+        self.server_side = server_side
+
+    def _cursor(self, conn, name: str):
+        if self.server_side:
+            cursor = conn.cursor(name=name)
+            cursor.itersize = self.batch_size
+            return cursor
+        return conn.cursor()
+
+    def _stream(self, sql: str, params: tuple, name: str):
+        with self.pool.connection() as conn:
+            cursor = self._cursor(conn, name)
+            try:
+                cursor.execute(sql, params)
+                while True:
+                    rows = cursor.fetchmany(self.batch_size)
+                    if not rows:
+                        return
+                    yield cursor.description, rows
+            finally:
+                cursor.close()
+
+    def iter_rows(self, since=None):
+        """
+        Yield order dicts ordered by updated_at. With `since`, only rows updated
+        at or after the watermark are returned (ties are re-read and filtered
+        out later by the per-record hashes).
+        """
+        sql = f"SELECT * FROM {self.table}"
+        params = ()
+        if since is not None:
+            sql += f" WHERE {ORDER_WATERMARK_COLUMN} >= {self.placeholder}"
+            params = (since,)
+        sql += f" ORDER BY {ORDER_WATERMARK_COLUMN}, id"
+
+        columns = None
+        for description, rows in self._stream(sql, params, "order_sync_rows"):
+            if columns is None:
+                columns = [col[0] for col in description]
+            for row in rows:
+                yield {col: normalize_value(value) for col, value in zip(columns, row)}
+
+    def iter_ids(self):
+        """
+        Yield every order id, used to detect deletions during incremental syncs.
+        """
+        for _, rows in self._stream(f"SELECT id FROM {self.table}", (), "order_sync_ids"):
+            for row in rows:
+                yield str(row[0])
+
+    def close(self):
+        self.pool.close()
+
+
+def connect_postgres():
+    import psycopg2
+
+    return psycopg2.connect(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", "5432")),
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+    )
+
+
+def get_order_source():
+    """
+    The configured order source, or None to read the static orders.json.
+    """
+    if ORDER_SOURCE == "postgres":
+        return OrderDatabaseSource(connect_postgres)
+    return None
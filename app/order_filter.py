@@ -6,6 +6,17 @@ from typing import List, Tuple, Optional
 from dateutil import parser as date_parser
 from dateutil.relativedelta import relativedelta
 
+# Questions about the order list as a whole ("how many orders are there")
+# are answered by the filter summary, never by retrieval
+LISTING_PATTERN = re.compile(
+    r"\b(how many|count|number of|total|list|show|all)\b"
+    r"|^\W*(orders?|all orders?)\W*$",
+    re.IGNORECASE,
+)
+
+def is_listing_query(query: str) -> bool:
+    return bool(LISTING_PATTERN.search(query))
+
 def parse_date_range(query: str) -> Tuple[Optional[datetime], Optional[datetime]]:
     now = datetime.now()
     query = query.lower()
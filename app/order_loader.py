@@ -3,40 +3,287 @@
 import json
 import os
 import hashlib
+import tempfile
+from contextlib import contextmanager
+
+from app.metrics import metrics, traced
 
 ORDER_JSON_PATH = "app/data/orders.json"
 CHECKSUM_FILE = "app/data/order_checksum.txt"
+# Small sync header (size, mtime, checksum, DB watermark) read on every start
+ORDER_STATE_FILE = "app/data/order_state.json"
+# Per-order hashes, only read when the orders actually need diffing
+ORDER_HASHES_FILE = "app/data/order_hashes.json"
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+class OrderDiff:
+    """
+    Added / changed / deleted order keys between two syncs, plus the
+    dataset checksum before and after.
+    """
+
+    def __init__(self, added=None, changed=None, deleted=None, checksum=None, previous_checksum=None):
+        self.added = added or []
+        self.changed = changed or []
+        self.deleted = deleted or []
+        self.checksum = checksum
+        self.previous_checksum = previous_checksum
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.changed or self.deleted)
+
+    def summary(self) -> str:
+        return f"{len(self.added)} added, {len(self.changed)} changed, {len(self.deleted)} deleted"
+
+
+def iter_raw_orders(path: str = ORDER_JSON_PATH):
+    """
+    Stream order records from a JSON array file one object at a time, so the
+    whole file is never held as a single string.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+        started = False
+
+        while True:
+            # Skip whitespace, the opening bracket and separators
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if not started and pos < len(buffer):
+                    if buffer[pos] != "[":
+                        raise ValueError(f"❌ {path} must contain a JSON array of orders.")
+                    started = True
+                    pos += 1
+                    continue
+                if pos < len(buffer) or eof:
+                    break
+                buffer = f.read(READ_BLOCK_SIZE)
+                pos = 0
+                eof = not buffer
+
+            if pos >= len(buffer) or buffer[pos] == "]":
+                return
 
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                more = f.read(READ_BLOCK_SIZE)
+                eof = not more
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
 
+            yield record
+            pos = end
+
+
+@traced("orders.load")
 def load_raw_orders():
     # 🔄 This should be replaced with your own data loading logic or static file
-    with open(ORDER_JSON_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return list(iter_raw_orders(ORDER_JSON_PATH))
 
 
-def get_order_checksum(orders) -> str:
-    data_str = json.dumps(orders, default=str, sort_keys=True)
+def order_key(order: dict) -> str:
+    return str(order.get("id", order.get("orderno")))
+
+
+def record_hash(order: dict) -> str:
+    data_str = json.dumps(order, default=str, sort_keys=True)
     return hashlib.md5(data_str.encode("utf-8")).hexdigest()
 
 
-def dump_orders_to_json():
-    print("🔄 Loading and checking orders...")
+def get_order_checksum(orders) -> str:
+    """
+    Dataset checksum built from the per-record hashes, in record order.
+    """
+    digest = hashlib.md5()
+    for order in orders:
+        digest.update(f"{order_key(order)}:{record_hash(order)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+@contextmanager
+def atomic_open(path: str):
+    """
+    Open a unique temp file next to `path` for writing and rename it over
+    `path` once the block succeeds, so concurrent writers never share a temp file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _load_json(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_order_state() -> dict:
+    return _load_json(ORDER_STATE_FILE)
+
+
+def load_order_hashes(state: dict) -> dict:
+    if not os.path.exists(ORDER_HASHES_FILE):
+        # State files from before the split kept the hashes inline
+        return state.get("hashes", {})
+    return _load_json(ORDER_HASHES_FILE)
+
+
+def save_order_state(state: dict, hashes: dict):
+    # Hashes first: a header is only ever written next to matching hashes
+    with atomic_open(ORDER_HASHES_FILE) as f:
+        json.dump(hashes, f)
+    with atomic_open(ORDER_STATE_FILE) as f:
+        json.dump(state, f)
+    with atomic_open(CHECKSUM_FILE) as f:
+        f.write(state["checksum"])
+
+
+def diff_order_hashes(records, previous_hashes: dict):
+    """
+    Hash each record as it streams past and compare with the previous hashes.
+    Returns (orders, hashes, diff) where the checksum covers the new dataset.
+    """
+    orders = []
+    hashes = {}
+    added, changed = [], []
+    digest = hashlib.md5()
+
+    for order in records:
+        key = order_key(order)
+        h = record_hash(order)
+        digest.update(f"{key}:{h}\n".encode("utf-8"))
+        if key not in previous_hashes:
+            added.append(key)
+        elif previous_hashes[key] != h:
+            changed.append(key)
+        hashes[key] = h
+        orders.append(order)
+
+    deleted = [key for key in previous_hashes if key not in hashes]
+    return orders, hashes, OrderDiff(added, changed, deleted, checksum=digest.hexdigest())
+
+
+def write_orders_json(orders, path: str = ORDER_JSON_PATH):
+    """
+    Write orders one record at a time to a temp file and rename it into place.
+    """
+    with atomic_open(path) as f:
+        f.write("[")
+        for i, order in enumerate(orders):
+            f.write(",\n" if i else "\n")
+            f.write(json.dumps(order, ensure_ascii=False, default=str))
+        f.write("\n]\n")
+
+
+def sync_orders_from_source(source, path: str = ORDER_JSON_PATH, detect_deletes: bool = True):
+    """
+    Incrementally pull orders from a database source using the updated_at
+    high-water mark, merge them into the cached orders.json and diff the result.
+    """
+    state = load_order_state()
+    watermark = state.get("db_watermark")
+    if not os.path.exists(path):
+        # Without the cached file an incremental pull would lose older orders
+        watermark = None
+
+    cached = {}
+    if watermark:
+        cached = {order_key(o): o for o in iter_raw_orders(path)}
+
+    previous_hashes = load_order_hashes(state)
+    hashes = dict(previous_hashes) if cached else {}
+    added, changed = [], []
+
+    # Only fetched rows are hashed; untouched orders keep their previous hash
+    fetched = 0
+    for row in source.iter_rows(since=watermark):
+        key = order_key(row)
+        h = record_hash(row)
+        if key not in previous_hashes:
+            added.append(key)
+        elif previous_hashes[key] != h:
+            changed.append(key)
+        cached[key] = row
+        hashes[key] = h
+        fetched += 1
+        if row.get("updated_at") and (watermark is None or str(row["updated_at"]) > watermark):
+            watermark = str(row["updated_at"])
+
+    if detect_deletes and state.get("db_watermark"):
+        live_ids = set(source.iter_ids())
+        for key in [key for key in cached if key not in live_ids]:
+            del cached[key]
+            hashes.pop(key, None)
+    deleted = [key for key in previous_hashes if key not in hashes]
+
+    digest = hashlib.md5()
+    for key in cached:
+        digest.update(f"{key}:{hashes[key]}\n".encode("utf-8"))
+    orders = list(cached.values())
+    diff = OrderDiff(added, changed, deleted, checksum=digest.hexdigest(), previous_checksum=state.get("checksum"))
+    print(f"🔄 Fetched {fetched} order rows from the database.")
+
+    if diff.has_changes or not os.path.exists(path):
+        write_orders_json(orders, path)
+    stat = os.stat(path)
+    save_order_state({
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "checksum": diff.checksum,
+        "db_watermark": watermark,
+    }, hashes)
+    return orders, diff
+
 
-    orders = load_raw_orders()
+@traced("orders.sync")
+def sync_orders(path: str = ORDER_JSON_PATH, source=None):
+    """
+    Load orders and work out what changed since the last sync.
+    When the file's size and mtime match the last sync, hashing is skipped entirely
+    and only the small state header is read, not the per-order hashes.
+    With a database `source`, new rows are pulled first (see sync_orders_from_source).
+    """
+    if source is not None:
+        return sync_orders_from_source(source, path)
 
-    new_checksum = get_order_checksum(orders)
-    if os.path.exists(CHECKSUM_FILE):
-        with open(CHECKSUM_FILE, "r") as f:
-            old_checksum = f.read().strip()
-        if new_checksum == old_checksum:
-            print("⚡ Order data unchanged — skipping dump.")
-            return orders
+    state = load_order_state()
+    stat = os.stat(path)
+    previous_checksum = state.get("checksum")
 
-    with open(ORDER_JSON_PATH, "w", encoding="utf-8") as f:
-        json.dump(orders, f, ensure_ascii=False, indent=2)
+    unchanged = state.get("size") == stat.st_size and state.get("mtime_ns") == stat.st_mtime_ns and bool(previous_checksum)
+    metrics.record_cache("order_state", unchanged)
+    if unchanged:
+        orders = list(iter_raw_orders(path))
+        return orders, OrderDiff(checksum=previous_checksum, previous_checksum=previous_checksum)
 
-    with open(CHECKSUM_FILE, "w") as f:
-        f.write(new_checksum)
+    orders, hashes, diff = diff_order_hashes(iter_raw_orders(path), load_order_hashes(state))
+    diff.previous_checksum = previous_checksum
+    save_order_state({
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "checksum": diff.checksum,
+    }, hashes)
+    return orders, diff
 
-    print(f"✅ {len(orders)} orders cached successfully.")
-    return orders
@@ -2,36 +2,304 @@
 
 import os
 import json
+from contextlib import contextmanager
 import numpy as np
-from app.vector_store import VectorStore
+from app.vector_store import VectorStore, build_compressed_index, load_compressed, serialize_compressed
 from app.embedder import get_embeddings
-from app.utils import chunk_json_data
+from app.utils import iter_chunks
+from app.index_snapshot import load_snapshot, write_snapshot, SnapshotError
+from app.order_loader import order_key, load_raw_orders
+from app.bulk_embedder import BulkEmbeddingJob
+from app.lexical_index import BM25Index
+from app.metrics import metrics, traced
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 ORDER_JSON_PATH = "app/data/orders.json"
+ORDER_CHECKSUM_PATH = "app/data/order_checksum.txt"
+ORDER_SNAPSHOT_PATH = "app/data/order_index.snap"
+LEXICAL_SECTION = "bm25"
+# "float32" (default), "float16" or "int8"; compressed modes re-rank against the snapshot
+ORDER_VECTOR_STORAGE = os.getenv("ORDER_VECTOR_STORAGE", "float32")
+# Trained compressed index stored in the snapshot, e.g. "vectors.int8"
+COMPRESSED_SECTION = f"vectors.{ORDER_VECTOR_STORAGE}"
+ORDER_VECTOR_RERANK_FACTOR = int(os.getenv("ORDER_VECTOR_RERANK_FACTOR", "4"))
+EMBED_BATCH_SIZE = 256
+# Cold rebuilds of at least this many orders are sharded across processes
+BULK_EMBED_MIN_ORDERS = int(os.getenv("BULK_EMBED_MIN_ORDERS", "20000"))
+BULK_EMBED_WORKERS = int(os.getenv("BULK_EMBED_WORKERS", os.cpu_count() or 1))
+
+# Legacy cache files, migrated into the snapshot on first start
 ORDER_EMBEDDINGS_PATH = "app/data/order_embeddings.npy"
 ORDER_CHUNKS_PATH = "app/data/order_chunks.json"
 
-def load_order_chunks():
-    with open(ORDER_JSON_PATH, "r", encoding="utf-8") as f:
-        orders = json.load(f)
-    return chunk_json_data(orders)
+def iter_order_chunks(orders, include=None, exclude=None):
+    """
+    Lazily chunk orders; each chunk carries its order key as `record_id`.
+    """
+    return iter_chunks(orders, id_key=order_key, include=include, exclude=exclude)
+
+def embed_chunks(chunks) -> np.ndarray:
+    embeddings = get_embeddings(chunks)
+    if hasattr(embeddings, "cpu"):
+        embeddings = embeddings.cpu().numpy()
+    return np.asarray(embeddings, dtype=np.float32)
+
+def embed_chunk_stream(chunks, batch_size=EMBED_BATCH_SIZE):
+    """
+    Embed chunks batch by batch while the chunker is still producing them.
+    Identical chunk texts are embedded once and their vector reused.
+    Returns (embeddings, texts, record_ids).
+    """
+    texts, record_ids, rows = [], [], []
+    unique_rows = {}
+    batch, parts = [], []
+
+    for chunk in chunks:
+        texts.append(chunk.text)
+        record_ids.append(chunk.record_id)
+        if chunk.hash not in unique_rows:
+            unique_rows[chunk.hash] = len(unique_rows)
+            batch.append(chunk.text)
+            if len(batch) >= batch_size:
+                parts.append(embed_chunks(batch))
+                batch = []
+        rows.append(unique_rows[chunk.hash])
+
+    if batch:
+        parts.append(embed_chunks(batch))
+    if not parts:
+        return np.zeros((0, 0), dtype=np.float32), texts, record_ids
+    return np.vstack(parts)[rows], texts, record_ids
+
+def read_source_checksum() -> str | None:
+    if not os.path.exists(ORDER_CHECKSUM_PATH):
+        return None
+    with open(ORDER_CHECKSUM_PATH, "r") as f:
+        return f.read().strip() or None
+
+def chunk_columns(chunks, record_ids=None) -> dict:
+    """
+    Per-chunk metadata columns stored alongside the embeddings.
+    """
+    ordernos = []
+    for chunk in chunks:
+        orderno = None
+        for part in chunk.split("||"):
+            if ":" in part:
+                k, v = part.split(":", 1)
+                if k.strip() == "orderno":
+                    orderno = v.strip()
+                    break
+        ordernos.append(orderno)
+    columns = {"orderno": ordernos}
+    if record_ids is not None:
+        columns["record_id"] = list(record_ids)
+    return columns
+
+def save_order_snapshot(embeddings, chunks, source_checksum=None, record_ids=None, lexical=None):
+    if lexical is None:
+        lexical = BM25Index.build(chunks)
+    sections = {LEXICAL_SECTION: lexical.to_bytes()}
+    if ORDER_VECTOR_STORAGE != "float32" and len(chunks):
+        # Trained once here so workers only deserialize the codes at startup
+        sections[COMPRESSED_SECTION] = serialize_compressed(build_compressed_index(embeddings, ORDER_VECTOR_STORAGE))
+    write_snapshot(
+        ORDER_SNAPSHOT_PATH,
+        embeddings,
+        chunks,
+        columns=chunk_columns(chunks, record_ids),
+        meta={"source_checksum": source_checksum, "source": ORDER_JSON_PATH},
+        extra_sections=sections,
+    )
+
+def load_order_lexical(snapshot) -> BM25Index:
+    view = snapshot.section_view(LEXICAL_SECTION)
+    if view is None:
+        return BM25Index.build(snapshot.chunks)
+    return BM25Index.from_buffer(view)
+
+def load_order_compressed(snapshot):
+    """
+    The compressed index persisted for ORDER_VECTOR_STORAGE, or None when the
+    snapshot was written without it (or for another storage mode).
+    """
+    if ORDER_VECTOR_STORAGE == "float32":
+        return None
+    view = snapshot.section_view(COMPRESSED_SECTION)
+    if view is None:
+        return None
+    compressed = load_compressed(view)
+    return compressed if compressed.ntotal == len(snapshot.chunks) else None
+
+def open_order_snapshot():
+    if not os.path.exists(ORDER_SNAPSHOT_PATH):
+        return None
+    try:
+        return load_snapshot(ORDER_SNAPSHOT_PATH)
+    except SnapshotError as e:
+        print(f"⚠️ Ignoring order snapshot: {e}")
+        return None
+
+def load_order_snapshot(source_checksum=None):
+    snapshot = open_order_snapshot()
+    if snapshot is not None and source_checksum and snapshot.meta.get("source_checksum") != source_checksum:
+        return None
+    return snapshot
+
+def update_order_snapshot(orders, diff):
+    """
+    Apply an order diff to the existing snapshot: drop chunks of changed or
+    deleted orders and embed only the added or changed ones.
+    Returns None when the snapshot cannot be patched and needs a full rebuild.
+    """
+    if diff.previous_checksum is None:
+        return None
+    snapshot = open_order_snapshot()
+    if snapshot is None or snapshot.meta.get("source_checksum") != diff.previous_checksum:
+        return None
+    record_ids = snapshot.columns.get("record_id")
+    if record_ids is None:
+        return None
+
+    dirty = set(diff.changed) | set(diff.deleted)
+    fresh = set(diff.added) | set(diff.changed)
+    keep = [i for i, key in enumerate(record_ids) if key not in dirty]
+
+    print(f"⚡ Updating order snapshot ({diff.summary()})...")
+    new_embeddings, new_chunks, new_ids = embed_chunk_stream(iter_order_chunks(o for o in orders if order_key(o) in fresh))
+    if not new_chunks:
+        new_embeddings = np.zeros((0, snapshot.dim), dtype=np.float32)
+    embeddings = np.vstack([snapshot.embeddings[keep], new_embeddings])
+    chunks = [snapshot.chunks[i] for i in keep] + new_chunks
+    ids = [record_ids[i] for i in keep] + new_ids
+    lexical = load_order_lexical(snapshot).apply(keep, new_chunks)
 
-def build_order_index(force_rebuild=False):
-    chunks = load_order_chunks()
+    save_order_snapshot(embeddings, chunks, diff.checksum, record_ids=ids, lexical=lexical)
+    return load_order_snapshot()
 
-    if not force_rebuild and os.path.exists(ORDER_EMBEDDINGS_PATH) and os.path.exists(ORDER_CHUNKS_PATH):
-        print("✅ Using cached order embeddings.")
+def bulk_rebuild_order_snapshot(orders, source_checksum=None, workers=BULK_EMBED_WORKERS) -> dict:
+    """
+    Full rebuild with multi-process embedding; resumes from checkpoints if a
+    previous rebuild of the same corpus was interrupted. Callers hold
+    order_build_lock() so only one job uses the checkpoint directory.
+    """
+    chunks, record_ids = [], []
+    for chunk in iter_order_chunks(orders):
+        chunks.append(chunk.text)
+        record_ids.append(chunk.record_id)
+
+    job = BulkEmbeddingJob(chunks, workers=workers)
+    embeddings = job.run()
+    save_order_snapshot(embeddings, chunks, source_checksum, record_ids=record_ids)
+    job.cleanup()
+    print(f"✅ Bulk embedding finished: {job.stats['chunks_per_s']} chunks/s with {job.stats['workers']} worker(s).")
+    return job.stats
+
+@contextmanager
+def order_build_lock():
+    """
+    Exclusive lock, shared by all worker processes, held while the snapshot is
+    built, patched or rewritten so only one worker embeds the corpus.
+    """
+    if fcntl is None:
+        # No flock on this platform; single-worker setups don't need it
+        yield
+        return
+    lock_path = f"{ORDER_SNAPSHOT_PATH}.lock"
+    os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+    with open(lock_path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def rebuild_order_snapshot(source_checksum=None, force_rebuild=False, orders=None, diff=None):
+    """
+    Patch, migrate or fully rebuild the snapshot; the caller holds the build lock.
+    """
+    snapshot = None
+    if not force_rebuild and orders is not None and diff is not None:
+        snapshot = update_order_snapshot(orders, diff)
+
+    if not force_rebuild and not os.path.exists(ORDER_SNAPSHOT_PATH) and os.path.exists(ORDER_EMBEDDINGS_PATH) and os.path.exists(ORDER_CHUNKS_PATH):
+        print("📦 Migrating cached order embeddings into a snapshot...")
         embeddings = np.load(ORDER_EMBEDDINGS_PATH)
         with open(ORDER_CHUNKS_PATH, "r", encoding="utf-8") as f:
             chunks = json.load(f)
-    else:
+        # The legacy cache was assumed current, so stamp it with today's checksum
+        save_order_snapshot(embeddings, chunks, source_checksum)
+        snapshot = load_order_snapshot()
+
+    if snapshot is None:
         print("⚡ Generating embeddings for orders...")
-        embeddings = get_embeddings(chunks)
-        np.save(ORDER_EMBEDDINGS_PATH, embeddings)
-        with open(ORDER_CHUNKS_PATH, "w", encoding="utf-8") as f:
-            json.dump(chunks, f, ensure_ascii=False, indent=2)
-
-    store = VectorStore(dim=len(embeddings[0]))
-    store.add(embeddings, chunks)
-    print(f"✅ Built index with {len(chunks)} chunks.")
-    return store, chunks
+        if orders is None:
+            orders = load_raw_orders()
+        if len(orders) >= BULK_EMBED_MIN_ORDERS:
+            bulk_rebuild_order_snapshot(orders, source_checksum)
+        else:
+            embeddings, chunks, record_ids = embed_chunk_stream(iter_order_chunks(orders))
+            save_order_snapshot(embeddings, chunks, source_checksum, record_ids=record_ids)
+        snapshot = load_order_snapshot()
+    return snapshot
+
+def register_index_gauges(snapshot, store, lexical):
+    metrics.set_gauge("index_chunks", "Chunks in the search index.", lambda: len(store), index="orders")
+    metrics.set_gauge("index_lexical_terms", "Distinct terms in the BM25 index.", lambda: len(lexical.vocab), index="orders")
+    metrics.set_gauge("index_vector_bytes", "Vector bytes held privately by the process (mmap excluded).",
+                      store.memory_bytes, index="orders")
+    metrics.set_gauge("snapshot_bytes", "Size of the index snapshot file.", lambda: os.path.getsize(snapshot.path), index="orders")
+    metrics.set_gauge("snapshot_age_seconds", "Seconds since the index snapshot was written.", snapshot.age_seconds, index="orders")
+
+@traced("orders.index")
+def build_order_index(force_rebuild=False, orders=None, diff=None):
+    source_checksum = diff.checksum if diff is not None else read_source_checksum()
+    snapshot = None if force_rebuild else load_order_snapshot(source_checksum)
+    metrics.record_cache("order_snapshot", snapshot is not None)
+
+    if snapshot is None:
+        with order_build_lock():
+            # Workers that waited for the lock find the snapshot another one just wrote
+            if not force_rebuild:
+                snapshot = load_order_snapshot(source_checksum)
+            if snapshot is None:
+                snapshot = rebuild_order_snapshot(source_checksum, force_rebuild, orders, diff)
+            else:
+                print("✅ Using order snapshot built by another worker.")
+    else:
+        print("✅ Using cached order snapshot.")
+
+    compressed = load_order_compressed(snapshot)
+    if compressed is None and ORDER_VECTOR_STORAGE != "float32" and len(snapshot.chunks):
+        with order_build_lock():
+            snapshot = load_order_snapshot() or snapshot
+            compressed = load_order_compressed(snapshot)
+            if compressed is None:
+                # Older snapshots (or a changed storage mode) get the trained index written in once
+                print(f"📦 Adding {ORDER_VECTOR_STORAGE} vectors to the order snapshot...")
+                save_order_snapshot(snapshot.embeddings, snapshot.chunks, snapshot.meta.get("source_checksum"),
+                                    record_ids=snapshot.columns.get("record_id"), lexical=load_order_lexical(snapshot))
+                snapshot = load_order_snapshot()
+                compressed = load_order_compressed(snapshot)
+
+    store = VectorStore(dim=snapshot.dim, storage=ORDER_VECTOR_STORAGE, rerank_factor=ORDER_VECTOR_RERANK_FACTOR)
+    store.attach(snapshot.embeddings, snapshot.chunks, compressed=compressed)
+    lexical = load_order_lexical(snapshot)
+    register_index_gauges(snapshot, store, lexical)
+    print(f"✅ Built index with {len(snapshot.chunks)} chunks ({len(lexical.vocab)} lexical terms).")
+    return store, snapshot.chunks, lexical
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild the order index snapshot.")
+    parser.add_argument("--workers", type=int, default=BULK_EMBED_WORKERS)
+    args = parser.parse_args()
+
+    with order_build_lock():
+        bulk_rebuild_order_snapshot(load_raw_orders(), read_source_checksum(), workers=args.workers)
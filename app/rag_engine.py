@@ -2,20 +2,40 @@
 
 import re
 import numpy as np
-from app.embedder import Embedder
+from app.embedder import get_embedder
 from app.vector_store import VectorStore
 from app.llm_wrapper import run_llm_query
 from app.order_formatter import format_order_record
-from app.order_filter import filter_orders
+from app.order_filter import filter_orders, is_listing_query
+from app.chat_session import is_follow_up
+from app.utils import chunk_json_data
+from app.hybrid_retriever import HybridRetriever
+from app.metrics import span
 
 
 class RAGEngine:
     def __init__(self):
-        self.embedder = Embedder()
+        self._embedder = None
         self.vstore = VectorStore(dim=768)
         self.text_chunks = []
         self.is_loaded = False
         self.raw_orders = []
+        self.lexical = None
+        self.retriever = None
+
+    @property
+    def embedder(self):
+        # Only needed when embedding new chunks, so load the model on first use
+        if self._embedder is None:
+            self._embedder = get_embedder()
+        return self._embedder
+
+    def warm_up(self):
+        """
+        Load the embedding model and encode one query, so the first retrieval
+        request does not pay for loading SentenceTransformer.
+        """
+        self.embedder.embed_query("warm up")
 
     def load_knowledge_base(self, chunks: list[str], raw_orders=None):
         if not chunks:
@@ -34,32 +54,85 @@ class RAGEngine:
         if raw_orders is not None:
             self.raw_orders = raw_orders
 
+    def attach_lexical_index(self, lexical):
+        """
+        Enable BM25 lookups and hybrid (BM25 + vector) retrieval over the store.
+        """
+        self.lexical = lexical
+        self.retriever = HybridRetriever(self.vstore, lexical, lambda q: self.embedder.embed_query(q))
+
+    def candidate_chunks(self, orderno: str):
+        # The inverted index narrows an order number lookup to the chunks containing it
+        if self.lexical is not None:
+            ids, _ = self.lexical.postings(orderno.lower())
+            return [self.text_chunks[int(i)] for i in ids] if ids is not None else []
+        return self.text_chunks
+
     def extract_orderno(self, text: str) -> str | None:
         match = re.search(r"\bON\d{5,}\b", text.upper())
         return match.group(0) if match else None
 
-    def query(self, user_query: str) -> list[str]:
+    def find_order_chunk(self, orderno: str) -> str | None:
+        for chunk in self.candidate_chunks(orderno):
+            fields = {
+                k.strip(): v.strip()
+                for part in chunk.split("||") if ":" in part
+                for k, v in [part.split(":", 1)]
+            }
+            if fields.get("orderno", "").lower() == orderno.lower():
+                return chunk
+        return None
+
+    def query(self, user_query: str, session=None) -> list[str]:
         if not self.is_loaded:
             return ["⚠ Knowledge base not loaded yet."]
 
-        extracted_orderno = self.extract_orderno(user_query)
+        with span("intent"):
+            extracted_orderno = self.extract_orderno(user_query)
         if extracted_orderno:
-            for chunk in self.text_chunks:
-                fields = {
-                    k.strip(): v.strip()
-                    for part in chunk.split("||") if ":" in part
-                    for k, v in [part.split(":", 1)]
-                }
-                if fields.get("orderno", "").lower() == extracted_orderno.lower():
-                    return [run_llm_query(user_query, [chunk])]
+            if session is not None and session.last_orderno == extracted_orderno and session.has_context():
+                return [run_llm_query(user_query, session.context_chunks, session=session)]
+
+            with span("orders.lookup"):
+                match = self.find_order_chunk(extracted_orderno)
+            if match is not None:
+                if session is not None:
+                    session.remember([match], orderno=extracted_orderno)
+                return [run_llm_query(user_query, [match], session=session)]
 
             return [f"No order found with order number {extracted_orderno}"]
 
+        filtered, summary = None, None
+        if self.raw_orders:
+            with span("filter"):
+                filtered, summary = filter_orders(self.raw_orders, user_query)
+
+        # Follow-ups ("and when was it updated?") reuse the last resolved context,
+        # but a turn that names its own status or date range is a new question
+        with span("intent"):
+            follow_up = (
+                session is not None and session.has_context()
+                and (filtered is None or filtered is self.raw_orders)
+                and is_follow_up(user_query)
+            )
+        if follow_up:
+            return [run_llm_query(user_query, session.context_chunks, session=session)]
+
         if self.raw_orders:
-            filtered, summary = filter_orders(self.raw_orders, user_query)
+            if filtered is self.raw_orders and self.retriever is not None and not is_listing_query(user_query):
+                # Free text that no filter or order number matched: answer from the best retrieved chunks
+                with span("retrieval"):
+                    chunks = self.retriever.search(user_query, top_k=5)
+                if chunks:
+                    if session is not None:
+                        session.remember(chunks)
+                    return [run_llm_query(user_query, chunks, session=session)]
             if not filtered:
                 return ["No orders matched your query."]
-            top_formatted = "\n\n".join(format_order_record(o) for o in filtered[:5])
+            if session is not None:
+                session.remember(chunk_json_data(filtered[:5]))
+            with span("format"):
+                top_formatted = "\n\n".join(format_order_record(o) for o in filtered[:5])
             return [f"{summary}\n\n{top_formatted}"]
 
         return ["No matching records found."]
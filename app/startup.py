@@ -0,0 +1,61 @@
+# app/startup.py
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    """
+    Records how long each startup phase takes and which components are ready.
+    Phases may run in parallel threads, so each one stores its own start offset.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases = {}
+        self.components = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name: str):
+        """
+        Record a phase that ran from process start (e.g. module imports) until now.
+        """
+        with self._lock:
+            self.phases[name] = {"start": 0.0, "duration": time.perf_counter() - self.started_at}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.phases[name] = {"start": start - self.started_at, "duration": end - start}
+
+    def set_component(self, name: str, status: str):
+        with self._lock:
+            self.components[name] = status
+
+    def is_ready(self) -> bool:
+        return bool(self.components) and all(s == "ready" for s in self.components.values())
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "uptime_s": round(time.perf_counter() - self.started_at, 3),
+                "phases": {
+                    name: {"start_s": round(p["start"], 3), "duration_s": round(p["duration"], 3)}
+                    for name, p in self.phases.items()
+                },
+                "components": dict(self.components),
+            }
+
+    def report(self):
+        print("⏱️ Startup timing breakdown:")
+        for name, p in sorted(self.phases.items(), key=lambda item: item[1]["start"]):
+            print(f"   {name:<24} +{p['start']:7.2f}s  {p['duration']:7.2f}s")
+
+
+startup_profile = StartupProfile()
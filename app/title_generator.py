@@ -0,0 +1,127 @@
+# app/title_generator.py
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from app.llm_wrapper import clean_message, generate_title_from_model
+from app.metrics import metrics
+
+TITLE_CACHE_MAX_ENTRIES = 2000
+# LLM upgrades queued or running at once; beyond this the extracted title is final
+TITLE_MAX_PENDING = int(os.getenv("TITLE_MAX_PENDING", "16"))
+TITLE_MIN_WORDS = 3
+TITLE_MAX_WORDS = 5
+FALLBACK_TITLE = "Untitled Chat"
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "for", "to", "in", "on", "at", "by",
+    "with", "from", "about", "into", "over", "under", "is", "are", "was", "were", "be",
+    "been", "do", "does", "did", "can", "could", "will", "would", "should", "may",
+    "i", "me", "my", "we", "our", "you", "your", "it", "its", "this", "that", "these",
+    "those", "there", "what", "which", "who", "whom", "when", "where", "why", "how",
+    "show", "list", "give", "tell", "get", "find", "please", "all", "any", "some",
+    "than", "then", "currently", "now", "much", "many", "have", "has", "had",
+}
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="title")
+_cache = OrderedDict()
+_lock = threading.Lock()
+_pending = 0
+
+metrics.set_gauge("title_cache_entries", "Titles held in the title cache.", lambda: len(_cache))
+metrics.set_gauge("title_pending", "LLM title upgrades queued or running.", lambda: _pending)
+
+
+def normalize_message(message: str) -> str:
+    return re.sub(r"\s+", " ", clean_message(message)).strip().lower()
+
+
+def title_key(message: str) -> str:
+    return hashlib.md5(normalize_message(message).encode("utf-8")).hexdigest()
+
+
+def extract_title(message: str) -> str:
+    """
+    Fast local titler: keeps the leading run of content words (a rough noun
+    phrase) and drops stopwords, numbers and ID-like tokens.
+    """
+    words = []
+    for token in re.findall(r"[A-Za-z][A-Za-z'-]*", clean_message(message)):
+        if token.lower() in STOPWORDS or len(token) < 3:
+            if len(words) >= TITLE_MIN_WORDS:
+                break
+            continue
+        if token.lower() not in (w.lower() for w in words):
+            words.append(token)
+        if len(words) >= TITLE_MAX_WORDS:
+            break
+
+    if not words:
+        return FALLBACK_TITLE
+    return " ".join(w if w.isupper() else w.capitalize() for w in words)
+
+
+def _store(key: str, title: str, final: bool):
+    with _lock:
+        _cache[key] = {"title": title, "final": final}
+        _cache.move_to_end(key)
+        while len(_cache) > TITLE_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def _upgrade_with_llm(key: str, message: str):
+    global _pending
+    try:
+        title = generate_title_from_model(message).strip().strip('"')
+    except Exception:
+        title = ""
+    finally:
+        with _lock:
+            _pending -= 1
+    with _lock:
+        entry = _cache.get(key)
+        current = entry["title"] if entry else FALLBACK_TITLE
+    # Keep the local title when the LLM fails or returns its own fallback
+    if title and title != FALLBACK_TITLE:
+        _store(key, title, final=True)
+    else:
+        _store(key, current, final=True)
+
+
+def request_title(message: str) -> dict:
+    """
+    Return a title immediately (cached or extractive) and schedule an LLM
+    upgrade in the background. Poll `get_title` with the returned id.
+    When TITLE_MAX_PENDING upgrades are already waiting, the extracted
+    title is final and no LLM call is queued.
+    """
+    global _pending
+    key = title_key(message)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+    metrics.record_cache("title", entry is not None)
+    if entry is not None:
+        return {"title_id": key, **entry}
+
+    title = extract_title(message)
+    with _lock:
+        saturated = _pending >= TITLE_MAX_PENDING
+        if not saturated:
+            _pending += 1
+    _store(key, title, final=saturated)
+    if saturated:
+        return {"title_id": key, "title": title, "final": True}
+    _executor.submit(_upgrade_with_llm, key, message)
+    return {"title_id": key, "title": title, "final": False}
+
+
+def get_title(key: str) -> dict | None:
+    with _lock:
+        entry = _cache.get(key)
+        return {"title_id": key, **entry} if entry else None
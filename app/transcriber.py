@@ -0,0 +1,319 @@
+# app/transcriber.py
+
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+WHISPER_MODEL_NAME = os.getenv("WHISPER_MODEL", "small")
+WHISPER_SAMPLE_RATE = 16000
+CPU_COUNT = os.cpu_count() or 1
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", max(1, CPU_COUNT // 4)))
+TRANSCRIBE_QUEUE_SIZE = int(os.getenv("TRANSCRIBE_QUEUE_SIZE", TRANSCRIBE_WORKERS * 2))
+
+# Energy-based VAD settings for streaming transcription
+VAD_FRAME_MS = 30
+VAD_MIN_SILENCE_MS = 500
+VAD_MIN_SEGMENT_MS = 300
+VAD_MAX_SEGMENT_S = 20
+VAD_PAD_MS = 150
+VAD_ENERGY_RATIO = 0.1
+VAD_ENERGY_FLOOR = 1e-4
+
+
+class TranscriptionQueueFull(RuntimeError):
+    pass
+
+
+# === Audio decoding (in memory) ===
+def decode_audio(data: bytes, sample_rate: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode any ffmpeg-readable audio from memory into mono float32 PCM.
+    The upload is piped through stdin and PCM read back from stdout, so no temp files are written.
+    """
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+    try:
+        result = subprocess.run(cmd, input=data, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        print("❌ FFmpeg conversion error:", e.stderr.decode(errors="ignore"))
+        raise RuntimeError("Audio conversion failed.")
+    return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def load_audio(audio) -> np.ndarray:
+    if isinstance(audio, np.ndarray):
+        return audio
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return decode_audio(bytes(audio))
+    with open(audio, "rb") as f:
+        return decode_audio(f.read())
+
+
+# === Voice activity detection ===
+def split_on_silence(samples: np.ndarray, sample_rate: int = WHISPER_SAMPLE_RATE) -> list[tuple[int, int]]:
+    """
+    Split PCM audio into speech segments on silent gaps using frame RMS energy.
+    Returns (start, end) sample offsets; long stretches of speech are cut at
+    VAD_MAX_SEGMENT_S so no single segment ties up a worker for too long.
+    """
+    frame = max(1, sample_rate * VAD_FRAME_MS // 1000)
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return [(0, len(samples))] if len(samples) else []
+
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    energy = np.sqrt(np.mean(frames * frames, axis=1))
+    threshold = max(VAD_ENERGY_FLOOR, VAD_ENERGY_RATIO * float(np.percentile(energy, 95)))
+    voiced = energy > threshold
+
+    min_silence = max(1, VAD_MIN_SILENCE_MS // VAD_FRAME_MS)
+    min_segment = max(1, VAD_MIN_SEGMENT_MS // VAD_FRAME_MS)
+    max_segment = max(1, VAD_MAX_SEGMENT_S * 1000 // VAD_FRAME_MS)
+    pad = VAD_PAD_MS // VAD_FRAME_MS
+
+    # (start, end, start_is_cut, end_is_cut); forced cuts get no padding, so
+    # neighbouring segments never overlap and no words are transcribed twice
+    segments = []
+    start = None
+    silence = 0
+    cut_at = None
+    for i, is_voiced in enumerate(voiced):
+        if is_voiced:
+            if start is None:
+                start = i
+            silence = 0
+        elif start is not None:
+            silence += 1
+            if silence >= min_silence:
+                segments.append((start, i - silence + 1, start == cut_at, False))
+                start = None
+                silence = 0
+        if start is not None and i + 1 - start >= max_segment:
+            segments.append((start, i + 1, start == cut_at, True))
+            cut_at = i + 1
+            start = None
+            silence = 0
+    if start is not None:
+        segments.append((start, n_frames - silence, start == cut_at, False))
+
+    ranges = []
+    for seg_start, seg_end, start_is_cut, end_is_cut in segments:
+        if seg_end - seg_start < min_segment:
+            continue
+        ranges.append((
+            seg_start * frame if start_is_cut else max(0, (seg_start - pad) * frame),
+            seg_end * frame if end_is_cut else min(len(samples), (seg_end + pad) * frame),
+        ))
+    return ranges
+
+
+# === Whisper model (one per process) ===
+_whisper_model = None
+
+def get_whisper_model(model_name: str = WHISPER_MODEL_NAME):
+    global _whisper_model
+    if _whisper_model is None:
+        import whisper
+
+        print(f"🔊 Loading Whisper model: {model_name}")
+        _whisper_model = whisper.load_model(model_name)
+    return _whisper_model
+
+
+def warmup_whisper_model():
+    # One second of silence runs the full decode path once so the first real request is not slow
+    get_whisper_model().transcribe(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32), fp16=False)
+
+
+def transcribe_audio(audio) -> str:
+    """
+    Transcribe raw bytes, a file path or a PCM array in the current process.
+    """
+    samples = load_audio(audio)
+    if samples.size == 0:
+        return ""
+    result = get_whisper_model().transcribe(samples, fp16=False)
+    return result["text"].strip()
+
+
+def transcribe_samples(samples: np.ndarray) -> str:
+    if samples.size == 0:
+        return ""
+    result = get_whisper_model().transcribe(samples, fp16=False, condition_on_previous_text=False)
+    return result["text"].strip()
+
+
+# === Worker pool ===
+def _init_worker(threads_per_worker: int):
+    try:
+        import torch
+
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+    warmup_whisper_model()
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+class TranscriptionPool:
+    """
+    Bounded process pool for Whisper transcription.
+    Each worker preloads and warms up its own model; submissions beyond
+    `workers + queue_size` in flight are rejected instead of piling up.
+    If a worker dies, the broken pool is dropped and a fresh one started.
+    """
+
+    def __init__(self, workers: int = TRANSCRIBE_WORKERS, queue_size: int = TRANSCRIBE_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.max_pending = self.workers + max(0, queue_size)
+        self.stream_concurrency = max(1, self.workers // 2)
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._async_start_lock = asyncio.Lock()
+        self._restart_task = None
+
+    def start(self):
+        """
+        Spawn the workers and wait for their models to load. Blocking; async
+        callers go through `ensure_started`.
+        """
+        with self._start_lock:
+            if self._executor is not None:
+                return
+            threads_per_worker = max(1, CPU_COUNT // self.workers)
+            print(f"🔊 Starting {self.workers} transcription worker(s), {threads_per_worker} thread(s) each...")
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(threads_per_worker,),
+            )
+            # Force every worker to spawn now so model loading happens at startup
+            futures = [executor.submit(_worker_ready) for _ in range(self.workers)]
+            for future in futures:
+                future.result()
+            self._executor = executor
+            print("✅ Transcription workers ready.")
+
+    async def ensure_started(self):
+        if self._executor is not None:
+            return
+        # One request starts the pool off the event loop; the others wait for it
+        async with self._async_start_lock:
+            if self._executor is None:
+                await asyncio.to_thread(self.start)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _discard_broken(self, executor):
+        """
+        Drop a pool whose worker died and start a replacement in the background.
+        """
+        with self._start_lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        print("⚠️ A transcription worker died; restarting the pool...")
+        executor.shutdown(wait=False, cancel_futures=True)
+        self._restart_task = asyncio.ensure_future(self.ensure_started())
+
+    async def _run_in_pool(self, fn, *args):
+        executor = self._executor
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            self._discard_broken(executor)
+            raise
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise TranscriptionQueueFull("Transcription queue is full, try again shortly.")
+            self._pending += 1
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args):
+        """
+        Run `fn(*args)` in a worker without blocking the event loop.
+        """
+        self._acquire()
+        try:
+            await self.ensure_started()
+            return await self._run_in_pool(fn, *args)
+        finally:
+            self._release()
+
+    async def transcribe(self, data: bytes) -> str:
+        return await self.run(transcribe_audio, data)
+
+    async def transcribe_stream(self, data: bytes):
+        """
+        Split the audio on silence, transcribe segments in parallel and yield
+        partial transcripts in order as soon as each prefix is complete.
+
+        Each yielded dict has the segment `index`, its `start`/`end` in seconds,
+        the segment `text` and the accumulated `transcript` so far.
+        """
+        self._acquire()
+        try:
+            await self.ensure_started()
+            loop = asyncio.get_running_loop()
+            samples = await loop.run_in_executor(None, decode_audio, data)
+            segments = split_on_silence(samples)
+
+            # A stream keeps at most half the workers busy, so other voice
+            # queries still find a free worker while a long message is
+            # transcribed (with a single worker they queue behind one segment)
+            limiter = asyncio.Semaphore(self.stream_concurrency)
+
+            async def run_segment(start, end):
+                async with limiter:
+                    return await self._run_in_pool(transcribe_samples, samples[start:end])
+
+            tasks = [asyncio.ensure_future(run_segment(start, end)) for start, end in segments]
+            transcript = []
+            try:
+                for index, ((start, end), task) in enumerate(zip(segments, tasks)):
+                    text = await task
+                    if text:
+                        transcript.append(text)
+                    yield {
+                        "index": index,
+                        "start": round(start / WHISPER_SAMPLE_RATE, 2),
+                        "end": round(end / WHISPER_SAMPLE_RATE, 2),
+                        "text": text,
+                        "transcript": " ".join(transcript),
+                    }
+            finally:
+                for task in tasks:
+                    task.cancel()
+        finally:
+            self._release()
+
+
+transcription_pool = TranscriptionPool()
@@ -1,19 +1,117 @@
 # app/utils.py
 
+import hashlib
+from fnmatch import fnmatchcase
+from typing import NamedTuple
+
+
+class Chunk(NamedTuple):
+    text: str
+    record_id: str | None
+    fields: tuple
+    hash: str
+
+
+def _match_field(key: str, patterns, sep: str) -> str | None:
+    """
+    Match a flattened key against field patterns (segments may use * wildcards).
+    Returns "full" when the key is the field or inside it, "partial" when the
+    key is an ancestor of a pattern, otherwise None.
+    """
+    parts = key.split(sep)
+    result = None
+    for pattern in patterns:
+        pattern_parts = pattern.split(sep)
+        if all(fnmatchcase(k, p) for k, p in zip(parts, pattern_parts)):
+            if len(parts) >= len(pattern_parts):
+                return "full"
+            result = "partial"
+    return result
+
+
+def iter_flatten(obj, parent_key='', sep='.', include=None, exclude=None):
+    """
+    Iteratively flatten nested JSON into "key: value" strings, depth first and in
+    the same order as `flatten_json`, without recursion or intermediate lists.
+
+    `include` keeps only the listed fields (and their children); `exclude` drops
+    them. Both take flattened keys such as "last_update.chPrams" or "items.*.name".
+    """
+    stack = [(parent_key, obj, include is None)]
+    while stack:
+        key, value, included = stack.pop()
+        if isinstance(value, dict):
+            children = ((f"{key}{sep}{k}" if key else k, v) for k, v in reversed(value.items()))
+        elif isinstance(value, list):
+            children = ((f"{key}{sep}{i}" if key else str(i), value[i]) for i in reversed(range(len(value))))
+        else:
+            value_str = f"{value:.6f}" if isinstance(value, float) else str(value)
+            yield f"{key}: {value_str}"
+            continue
+
+        for child_key, child in children:
+            if exclude and _match_field(child_key, exclude, sep) == "full":
+                continue
+            child_included = included
+            if not included:
+                match = _match_field(child_key, include, sep)
+                if match is None:
+                    continue
+                child_included = match == "full"
+                # A scalar that is only an ancestor of an include pattern has nothing to keep
+                if not child_included and not isinstance(child, (dict, list)):
+                    continue
+            stack.append((child_key, child, child_included))
+
+
 def flatten_json(obj, parent_key='', sep='.'):
-    items = []
-    if isinstance(obj, dict):
-        for key, value in obj.items():
-            new_key = f"{parent_key}{sep}{key}" if parent_key else key
-            items.extend(flatten_json(value, new_key, sep=sep))
-    elif isinstance(obj, list):
-        for index, item in enumerate(obj):
-            new_key = f"{parent_key}{sep}{index}" if parent_key else str(index)
-            items.extend(flatten_json(item, new_key, sep=sep))
-    else:
-        value_str = f"{obj:.6f}" if isinstance(obj, float) else str(obj)
-        items.append(f"{parent_key}: {value_str}")
-    return items
+    return list(iter_flatten(obj, parent_key, sep=sep))
+
+
+def iter_chunks(data, chunk_size=100, id_key="id", include=None, exclude=None, dedupe=False):
+    """
+    Lazily turn a list (or any iterable) of JSON-like records into flattened
+    text chunks tagged with their source record id and field names, so that
+    consumers such as the embedder can start before chunking finishes.
+
+    `id_key` is the record field holding the id, or a callable returning it.
+    With `dedupe`, chunks whose text was already produced are skipped.
+    """
+    seen = set()
+    for record in data:
+        if callable(id_key):
+            record_id = id_key(record)
+        else:
+            record_id = record.get(id_key) if isinstance(record, dict) else None
+        record_id = None if record_id is None else str(record_id)
+
+        batch = []
+        flat = iter_flatten(record, include=include, exclude=exclude)
+        while True:
+            batch.clear()
+            for item in flat:
+                batch.append(item)
+                if len(batch) >= chunk_size:
+                    break
+            if not batch:
+                break
+
+            text = " || ".join(batch)
+            digest = hashlib.md5(text.encode("utf-8")).hexdigest()
+            if dedupe:
+                if digest in seen:
+                    continue
+                seen.add(digest)
+            fields = tuple(item.split(": ", 1)[0] for item in batch)
+            yield Chunk(text, record_id, fields, digest)
+
+
+def chunk_text(text: str, max_words=100) -> list[str]:
+    """
+    Split free text into chunks of at most `max_words` words.
+    """
+    words = text.split()
+    return [" ".join(words[i:i + max_words]) for i in range(0, len(words), max_words)]
 
 
 def chunk_json_data(data, chunk_size=100):
@@ -21,11 +119,6 @@ def chunk_json_data(data, chunk_size=100):
     Converts a list of JSON-like dictionaries into smaller flattened text chunks
     suitable for vector embedding.
     """
-    chunks = []
-    if isinstance(data, list):
-        for record in data:
-            flat = flatten_json(record)
-            for i in range(0, len(flat), chunk_size):
-                chunk = " || ".join(flat[i:i + chunk_size])
-                chunks.append(chunk)
-    return chunks
+    if not isinstance(data, list):
+        return []
+    return [chunk.text for chunk in iter_chunks(data, chunk_size)]
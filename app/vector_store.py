@@ -1,54 +1,200 @@
 # app/vector_store.py
 
-import faiss
 import numpy as np
 
+from app.metrics import span
+
+# Compressed storage modes (FAISS index_factory strings) searched before exact re-ranking
+STORAGE_FACTORIES = {
+    "float16": lambda dim: "SQfp16",
+    "int8": lambda dim: "SQ8",
+}
+QUANTIZER_TRAIN_SAMPLE = 100_000
+QUANTIZER_ADD_BATCH = 65536
+
+
+def _iter_blocks(embeddings):
+    if hasattr(embeddings, "iter_blocks"):
+        yield from embeddings.iter_blocks()
+        return
+    for start in range(0, len(embeddings), QUANTIZER_ADD_BATCH):
+        yield embeddings[start:start + QUANTIZER_ADD_BATCH]
+
+
+def build_compressed_index(embeddings, storage: str):
+    """
+    Train a FAISS index for a compressed `storage` mode and add every row.
+    `embeddings` is an (n, dim) array or a block source with `iter_blocks()`.
+    """
+    import faiss
+
+    if storage not in STORAGE_FACTORIES:
+        raise ValueError(f"❌ Unknown vector storage mode: '{storage}'")
+    n, dim = embeddings.shape
+    index = faiss.index_factory(dim, STORAGE_FACTORIES[storage](dim), faiss.METRIC_L2)
+    if not index.is_trained:
+        # An evenly strided sample, so block sources need no random access
+        step = max(1, n // QUANTIZER_TRAIN_SAMPLE)
+        sample, seen = [], 0
+        for block in _iter_blocks(embeddings):
+            sample.append(np.asarray(block[(-seen) % step::step], dtype=np.float32))
+            seen += len(block)
+        index.train(np.ascontiguousarray(np.vstack(sample)[:QUANTIZER_TRAIN_SAMPLE]))
+    for block in _iter_blocks(embeddings):
+        index.add(np.ascontiguousarray(block, dtype=np.float32))
+    return index
+
+
+def serialize_compressed(index) -> bytes:
+    import faiss
+
+    return faiss.serialize_index(index).tobytes()
+
+
+def load_compressed(buffer):
+    """
+    Rebuild a compressed index from `serialize_compressed` output (bytes or a
+    snapshot section view) without retraining it.
+    """
+    import faiss
+
+    return faiss.deserialize_index(np.frombuffer(buffer, dtype=np.uint8))
+
 
 class VectorStore:
     """
     In-memory vector store using FAISS for similarity search.
     Stores text chunks and enables semantic retrieval using dense embeddings.
+
+    A store can also be attached to read-only embeddings (e.g. a memory-mapped
+    index snapshot); searches then run directly over that array without copying it.
+    With a compressed `storage` mode ("float16" or "int8") attached stores
+    search the compact codes first and re-rank the top `top_k * rerank_factor`
+    candidates exactly against the full-precision rows.
     """
 
-    def __init__(self, dim: int):
+    def __init__(self, dim: int, storage: str = "float32", rerank_factor: int = 4):
+        import faiss
+
+        if storage != "float32" and storage not in STORAGE_FACTORIES:
+            raise ValueError(f"❌ Unknown vector storage mode: '{storage}'")
         self.index = faiss.IndexFlatL2(dim)
         self.text_chunks = []
         self.dim = dim
+        self.embeddings = None
+        self.storage = storage
+        self.rerank_factor = rerank_factor
+        self.compressed = None
+
+    def attach(self, embeddings: np.ndarray, texts, compressed=None):
+        """
+        Serve searches from an existing float32 (n, dim) array and chunk sequence.
+        A prebuilt `compressed` index (e.g. loaded from the snapshot) is reused
+        when it covers every row; otherwise one is trained here.
+        """
+        self.index.reset()
+        self.embeddings = embeddings
+        self.text_chunks = texts
+        self.compressed = None
+        if self.storage != "float32" and len(embeddings):
+            if compressed is None or compressed.ntotal != len(embeddings):
+                compressed = build_compressed_index(embeddings, self.storage)
+            self.compressed = compressed
+
+    def memory_bytes(self) -> int:
+        """
+        Bytes of vector data private to this process (excludes the shared mmap).
+        """
+        if self.compressed is not None:
+            return self.compressed.sa_code_size() * self.compressed.ntotal
+        if self.embeddings is not None:
+            return 0
+        return self.index.ntotal * self.dim * 4
 
     def add(self, embeddings, texts):
         """
         Add embeddings and corresponding text chunks to the store.
         """
+        if self.embeddings is not None:
+            # Adding to an attached snapshot materializes a private copy
+            self.index.add(np.ascontiguousarray(self.embeddings, dtype=np.float32))
+            self.text_chunks = list(self.text_chunks)
+            self.embeddings = None
+            self.compressed = None
         embeddings_np = np.array(embeddings, dtype=np.float32)
         self.index.add(embeddings_np)
         self.text_chunks.extend(texts)
 
+    def __len__(self):
+        return len(self.text_chunks)
+
+    def _all_embeddings(self) -> np.ndarray:
+        if self.embeddings is not None:
+            return self.embeddings
+        return self.index.reconstruct_n(0, self.index.ntotal)
+
+    def search_ids(self, query_embedding, top_k=3) -> list[int]:
+        """
+        Return the row ids of the nearest chunks over the whole store.
+        """
+        import faiss
+
+        if not len(self.text_chunks):
+            return []
+        query_vec = np.array([query_embedding], dtype=np.float32).reshape(1, -1)
+        top_k = min(top_k, len(self.text_chunks))
+        with span("faiss"):
+            if self.compressed is not None:
+                return self._search_reranked(query_vec, top_k)
+            if self.embeddings is not None:
+                _, indices = faiss.knn(query_vec, self.embeddings, top_k)
+            else:
+                _, indices = self.index.search(query_vec, top_k)
+        return [int(i) for i in indices[0] if i >= 0]
+
+    def _search_reranked(self, query_vec: np.ndarray, top_k: int) -> list[int]:
+        # Candidates from the compressed codes, then exact L2 on the full-precision rows
+        _, candidates = self.compressed.search(query_vec, top_k * self.rerank_factor)
+        candidates = np.sort(candidates[0][candidates[0] >= 0])
+        if not len(candidates):
+            return []
+        rows = np.asarray(self.embeddings[candidates], dtype=np.float32)
+        distances = ((rows - query_vec) ** 2).sum(axis=1)
+        order = np.argsort(distances, kind="stable")[:top_k]
+        return [int(i) for i in candidates[order]]
+
     def search(self, query_embedding, top_k=3, chunks=None):
         """
         Perform similarity search on the text chunks using FAISS.
 
         If `chunks` are provided, search only over those; otherwise search entire store.
         """
+        import faiss
+
+        query_vec = np.array([query_embedding], dtype=np.float32)
+
         if chunks is None:
-            chunks = self.text_chunks
+            if not len(self.text_chunks):
+                return ["⚠️ No matching chunks available for search."]
+            return [self.text_chunks[i] for i in self.search_ids(query_embedding, top_k)]
 
         if not chunks:
             return ["⚠️ No matching chunks available for search."]
 
-        # Map chunk text to FAISS index
-        full_embeddings = self.index.reconstruct_n(0, self.index.ntotal)
-        chunk_to_index = {text: i for i, text in enumerate(self.text_chunks)}
+        with span("faiss"):
+            # Map chunk text to FAISS index
+            full_embeddings = self._all_embeddings()
+            chunk_to_index = {text: i for i, text in enumerate(self.text_chunks)}
 
-        # Filter based on given chunks
-        filtered_indices = [chunk_to_index[c] for c in chunks if c in chunk_to_index]
-        filtered_embeddings = [full_embeddings[i] for i in filtered_indices]
+            # Filter based on given chunks
+            filtered_indices = [chunk_to_index[c] for c in chunks if c in chunk_to_index]
+            filtered_embeddings = [full_embeddings[i] for i in filtered_indices]
 
-        if not filtered_embeddings:
-            return ["⚠️ No matching embeddings found."]
+            if not filtered_embeddings:
+                return ["⚠️ No matching embeddings found."]
 
-        temp_index = faiss.IndexFlatL2(self.dim)
-        temp_index.add(np.array(filtered_embeddings, dtype=np.float32))
+            temp_index = faiss.IndexFlatL2(self.dim)
+            temp_index.add(np.array(filtered_embeddings, dtype=np.float32))
 
-        query_vec = np.array([query_embedding], dtype=np.float32)
-        _, indices = temp_index.search(query_vec, top_k)
+            _, indices = temp_index.search(query_vec, top_k)
         return [chunks[i] for i in indices[0]]
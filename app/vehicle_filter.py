@@ -2,7 +2,9 @@
 
 import re
 from app.vehicle_formatter import reverse_geocode, angle_to_direction
+from app.metrics import traced
 
+@traced("vehicle.intent")
 def extract_vehicle_filters(query: str) -> dict:
     query = query.lower()
     filters = {}
@@ -90,6 +92,7 @@ def extract_vehicle_filters(query: str) -> dict:
 
     return filters
 
+@traced("vehicle.filter")
 def filter_vehicles(data: list[dict], criteria: dict) -> list[dict]:
     filtered = []
 
@@ -1,15 +1,25 @@
 # app/vehicle_formatter.py
 
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderUnavailable, GeocoderTimedOut
 import requests
 from datetime import datetime
 
-geolocator = Nominatim(user_agent="vehicle-formatter")
+from app.metrics import span, traced
+
+geolocator = None
+
+def get_geolocator():
+    global geolocator
+    if geolocator is None:
+        from geopy.geocoders import Nominatim
+
+        geolocator = Nominatim(user_agent="vehicle-formatter")
+    return geolocator
 
 def reverse_geocode(lat: float, lng: float) -> str:
+    from geopy.exc import GeocoderUnavailable, GeocoderTimedOut
+
     try:
-        location = geolocator.reverse((lat, lng), exactly_one=True, language="en")
+        location = get_geolocator().reverse((lat, lng), exactly_one=True, language="en")
         return location.address if location else "Location unavailable"
     except (GeocoderUnavailable, GeocoderTimedOut):
         return "Location unavailable"
@@ -40,6 +50,7 @@ def get_weather_data(lat, lon, days=1):
     except Exception:
         return None
 
+@traced("vehicle.format")
 def format_vehicle_data(vehicle: dict, section: str = "all") -> str:
     name = vehicle.get('name', 'Unknown')
     last_update = vehicle.get("last_update", {}) or {}
@@ -51,13 +62,15 @@ def format_vehicle_data(vehicle: dict, section: str = "all") -> str:
     lat = last_update.get("lat")
     lng = last_update.get("lng")
 
-    location_str = reverse_geocode(lat, lng) if lat and lng else None
+    with span("geocode"):
+        location_str = reverse_geocode(lat, lng) if lat and lng else None
     full_location_str = (
         f"The vehicle {name} is currently located at {location_str}" if location_str
         else f"The vehicle {name}'s location is currently unknown"
     )
 
-    weather_info = get_weather_data(lat, lng) if lat and lng else None
+    with span("weather"):
+        weather_info = get_weather_data(lat, lng) if lat and lng else None
     if weather_info:
         loc = weather_info.get("location", {})
         curr = weather_info.get("current", {})
@@ -0,0 +1,39 @@
+# benchmarks/bench_bulk_embedding.py
+#
+# Chunks/s of the sharded bulk embedding job for different worker counts.
+# Usage: python -m benchmarks.bench_bulk_embedding --chunks 20000 --workers 1 2 4 8 16 32
+
+import argparse
+import os
+import tempfile
+
+from app.bulk_embedder import BulkEmbeddingJob
+from app.utils import iter_chunks
+from benchmarks.synthetic import iter_orders
+
+
+def synthetic_chunks(n: int, seed: int = 42) -> list[str]:
+    return [chunk.text for chunk in iter_chunks(iter_orders(n, seed))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--shard-size", type=int, default=512)
+    args = parser.parse_args()
+
+    texts = synthetic_chunks(args.chunks)
+    print(f"{'workers':>8} {'seconds':>9} {'chunks/s':>10}")
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            job = BulkEmbeddingJob(
+                texts, workers=workers, shard_size=args.shard_size,
+                checkpoint_dir=os.path.join(tmp, "checkpoint"), progress=lambda *_: None,
+            )
+            job.run()
+            print(f"{workers:>8} {job.stats['seconds']:>9.2f} {job.stats['chunks_per_s']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
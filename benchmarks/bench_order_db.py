@@ -0,0 +1,89 @@
+# benchmarks/bench_order_db.py
+#
+# Throughput of the database order sync against a local SQLite stand-in.
+# Usage: python -m benchmarks.bench_order_db --rows 200000
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+import app.order_loader as order_loader
+from app.order_db import OrderDatabaseSource
+from benchmarks.synthetic import iter_orders
+
+COLUMNS = ["id", "orderno", "qty", "status_name", "branch_name", "material_name", "created_at", "updated_at"]
+
+
+def create_orders_db(path: str, rows: int, seed: int = 42):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY, orderno TEXT, qty INTEGER, status_name TEXT,
+            branch_name TEXT, material_name TEXT, created_at TEXT, updated_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX orders_updated_at ON orders (updated_at)")
+    batch = []
+    for order in iter_orders(rows, seed, start=datetime(2024, 1, 1)):
+        batch.append(tuple(order[c] for c in COLUMNS))
+        if len(batch) >= 10_000:
+            conn.executemany("INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+
+
+def touch_orders(path: str, count: int):
+    conn = sqlite3.connect(path)
+    now = datetime(2030, 1, 1).isoformat()
+    conn.execute("UPDATE orders SET status_name = 'Completed', updated_at = ? WHERE id <= ?", (now, count))
+    conn.execute("DELETE FROM orders WHERE id = (SELECT MAX(id) FROM orders)")
+    conn.commit()
+    conn.close()
+
+
+def timed_sync(source, orders_path: str) -> tuple[float, object]:
+    start = time.perf_counter()
+    _, diff = order_loader.sync_orders(orders_path, source=source)
+    return time.perf_counter() - start, diff
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--updates", type=int, default=1_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "orders.db")
+        orders_path = os.path.join(tmp, "orders.json")
+        order_loader.ORDER_STATE_FILE = os.path.join(tmp, "order_state.json")
+        order_loader.CHECKSUM_FILE = os.path.join(tmp, "order_checksum.txt")
+        order_loader.ORDER_HASHES_FILE = os.path.join(tmp, "order_hashes.json")
+
+        create_orders_db(db_path, args.rows)
+        source = OrderDatabaseSource(
+            lambda: sqlite3.connect(db_path, check_same_thread=False),
+            batch_size=args.batch_size, paramstyle="qmark", server_side=False,
+        )
+
+        elapsed, diff = timed_sync(source, orders_path)
+        print(f"full sync:        {args.rows:>9} rows  {elapsed:7.2f}s  {args.rows / elapsed:>10.0f} rows/s  ({diff.summary()})")
+
+        touch_orders(db_path, args.updates)
+        elapsed, diff = timed_sync(source, orders_path)
+        print(f"incremental sync: {args.updates:>9} rows  {elapsed:7.2f}s  {args.rows / elapsed:>10.0f} rows/s of dataset  ({diff.summary()})")
+
+        elapsed, diff = timed_sync(source, orders_path)
+        print(f"no-op sync:       {0:>9} rows  {elapsed:7.2f}s  ({diff.summary()})")
+        source.close()
+
+
+if __name__ == "__main__":
+    main()
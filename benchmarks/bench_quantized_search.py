@@ -0,0 +1,73 @@
+# benchmarks/bench_quantized_search.py
+#
+# Memory per million chunks and recall@k of the compressed vector storage
+# modes (with exact re-ranking) against the flat float32 baseline, plus the
+# one-off training cost and the time to load the trained index from its
+# serialized snapshot section.
+# Usage: python -m benchmarks.bench_quantized_search --chunks 100000 --dim 768
+
+import argparse
+import time
+
+import numpy as np
+
+from app.vector_store import VectorStore, build_compressed_index, load_compressed, serialize_compressed
+
+
+def synthetic_embeddings(n: int, dim: int, clusters: int = 256, seed: int = 42) -> np.ndarray:
+    # Clustered vectors are closer to real sentence embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return centers[labels] + 0.35 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def recall_at_k(results: list[list[int]], truth: list[list[int]], k: int) -> float:
+    hits = sum(len(set(r[:k]) & set(t[:k])) for r, t in zip(results, truth))
+    return hits / (k * len(truth))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    embeddings = synthetic_embeddings(args.chunks, args.dim)
+    queries = synthetic_embeddings(args.queries, args.dim, seed=7)
+    texts = [f"chunk {i}" for i in range(args.chunks)]
+
+    truth = None
+    print(f"{'storage':>8} {'bytes/vec':>10} {'MB per 1M':>10} {'recall@k':>9} {'ms/query':>9} {'build s':>8} {'load s':>7}")
+    for storage in ["float32", "float16", "int8"]:
+        compressed, build, load = None, 0.0, 0.0
+        if storage != "float32":
+            start = time.perf_counter()
+            data = serialize_compressed(build_compressed_index(embeddings, storage))
+            build = time.perf_counter() - start
+            start = time.perf_counter()
+            compressed = load_compressed(data)
+            load = time.perf_counter() - start
+
+        store = VectorStore(args.dim, storage=storage, rerank_factor=args.rerank_factor)
+        store.attach(embeddings, texts, compressed=compressed)
+
+        start = time.perf_counter()
+        results = [store.search_ids(q, args.k) for q in queries]
+        per_query = (time.perf_counter() - start) / len(queries) * 1000
+
+        if truth is None:
+            truth = results
+        # The float32 baseline keeps full vectors resident; compressed modes only keep codes
+        bytes_per_vec = store.memory_bytes() / args.chunks if store.compressed is not None else args.dim * 4
+        print(
+            f"{storage:>8} {bytes_per_vec:>10.0f} {bytes_per_vec * 1e6 / 2**20:>10.0f} "
+            f"{recall_at_k(results, truth, args.k):>9.3f} {per_query:>9.2f} {build:>8.1f} {load:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
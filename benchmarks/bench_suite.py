@@ -0,0 +1,507 @@
+# benchmarks/bench_suite.py
+#
+# Timings for every hot path on seeded synthetic orders and fleets, with the
+# LLM, geocoder, weather, telemetry and embedding backends stubbed out.
+# Results are written as JSON and compared against a stored baseline; any case
+# that stays slower than the baseline by more than the tolerance after being
+# re-measured fails the run.
+#
+# Usage:
+#   python -m benchmarks.bench_suite                       # default sizes, compare with baseline
+#   python -m benchmarks.bench_suite --full                # orders up to 5M, fleets up to 100k
+#   python -m benchmarks.bench_suite --update-baseline     # record this machine's baseline
+#   python -m benchmarks.bench_suite --only filter_orders vector_search
+
+import argparse
+import gc
+import itertools
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+
+from benchmarks.stubs import EMBEDDING_DIM, stub_backends
+from benchmarks.synthetic import generate_fleet, generate_orders
+
+BASELINE_PATH = "benchmarks/baseline.json"
+RESULTS_PATH = "benchmarks/results.json"
+
+DEFAULT_SIZES = {"orders": [10_000, 100_000], "fleet": [1_000, 10_000], "index": [10_000], "vectors": [10_000, 100_000]}
+FULL_SIZES = {
+    "orders": [10_000, 100_000, 1_000_000, 5_000_000],
+    "fleet": [1_000, 10_000, 100_000],
+    "index": [10_000, 100_000, 1_000_000],
+    "vectors": [10_000, 100_000, 1_000_000],
+}
+
+ORDER_QUERIES = {
+    "completed": "show completed orders",
+    "cancelled_this_month": "cancelled orders this month",
+    "last_month": "orders created last month",
+    "unfiltered": "sand deliveries for the Jeddah branch",
+}
+VEHICLE_QUERIES = {
+    "speed_above": "vehicles moving faster than 80 km/h",
+    "speed_range": "trucks with speed between 40 and 90",
+    "stationary_region": "stationary vehicles in Riyadh",
+    "diesel_heading": "diesel trucks heading north-west",
+    "alarm": "vehicles with a hard cornering alarm",
+}
+CHAT_ORDER_REQUESTS = {
+    "orderno": ("status of ON{orderno:07d}", None),
+    "orderno_follow_up": ("and when was it updated?", "bench-session"),
+    "filter": ("completed orders this month", None),
+    "hybrid": ("sand deliveries for the Jeddah branch", None),
+}
+CHAT_REQUESTS = {
+    "fleet_question": "which vehicles are moving faster than 80 km/h",
+}
+# Each timed sample lasts at least this long; fast calls are repeated to fill it
+MIN_SAMPLE_MS = 50.0
+MAX_NUMBER = 100_000
+# Cap on how much of a case's own sample spread is added to the tolerance
+MAX_NOISE_ALLOWANCE = 0.5
+REFERENCE_REPEAT = 5
+
+CASES = ["filter_orders", "chunk_json_data", "extract_vehicle_filters", "filter_vehicles",
+         "format_vehicle_data", "vector_search", "build_order_index", "endpoints"]
+
+
+# === Measurement ===
+def measure(fn, repeat: int = 7, number: int | None = None, warmup: int = 1) -> dict:
+    """
+    Run `fn` `number` times per sample; report per-call milliseconds. Without
+    `number`, calls are batched so that each sample lasts at least
+    MIN_SAMPLE_MS, which keeps millisecond cases from being judged on a
+    handful of calls.
+    """
+    call_ms = None
+    for _ in range(max(warmup, 1 if number is None else 0)):
+        start = time.perf_counter()
+        fn()
+        call_ms = (time.perf_counter() - start) * 1000
+    if number is None:
+        number = min(MAX_NUMBER, max(1, math.ceil(MIN_SAMPLE_MS / max(call_ms, 1e-6))))
+    # Like timeit, keep collector pauses triggered by earlier cases out of the samples
+    gc.collect()
+    gc.disable()
+    samples, reference = [], []
+    try:
+        for _ in range(max(1, repeat)):
+            reference.append(time_reference())
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            samples.append((time.perf_counter() - start) / number * 1000)
+    finally:
+        gc.enable()
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))], 4),
+        "min_ms": round(samples[0], 4),
+        "runs": len(samples) * number,
+        "reference_ms": round(statistics.median(reference), 4),
+    }
+
+
+def measure_once(fn) -> tuple[dict, object]:
+    reference = [time_reference() for _ in range(REFERENCE_REPEAT)]
+    start = time.perf_counter()
+    value = fn()
+    elapsed = round((time.perf_counter() - start) * 1000, 4)
+    reference += [time_reference() for _ in range(REFERENCE_REPEAT)]
+    timing = {"median_ms": elapsed, "p95_ms": elapsed, "min_ms": elapsed, "runs": 1,
+              "reference_ms": round(statistics.median(reference), 4)}
+    return timing, value
+
+
+def _reference_workload():
+    rows = [{"id": i, "status": ("Completed", "Pending", "Cancelled")[i % 3], "qty": i % 97} for i in range(2000)]
+    return sum(len(f"orderno: ON{row['id']:07d} || status: {row['status']}") for row in rows if row["qty"] > 10)
+
+
+def time_reference() -> float:
+    """
+    Milliseconds for a fixed pure-Python workload. It is timed next to every
+    sample, so its ratio to the baseline's value tracks how fast the machine
+    was running while that case was measured (shared VMs drift by 2x and more).
+    """
+    start = time.perf_counter()
+    _reference_workload()
+    return (time.perf_counter() - start) * 1000
+
+
+def repeats_for(n: int, repeat: int) -> int:
+    # Keep multi-million row cases to a single timed run
+    return repeat if n <= 100_000 else 1
+
+
+def record(results: dict, name: str, timing: dict, **params):
+    key = name + ("[" + ",".join(f"{k}={v}" for k, v in params.items()) + "]" if params else "")
+    results[key] = {**timing, "params": params}
+    print(f"  {key:<64} {timing['median_ms']:>11.3f} ms  (p95 {timing['p95_ms']:.3f}, n={timing['runs']})")
+
+
+# === Cases ===
+def bench_filter_orders(results, orders, sizes, args):
+    from app.order_filter import filter_orders
+
+    for n in sizes:
+        subset = orders[:n]
+        for label, query in ORDER_QUERIES.items():
+            record(results, "filter_orders", measure(lambda: filter_orders(subset, query), repeats_for(n, args.repeat)),
+                   orders=n, query=label)
+
+
+def bench_chunk_json_data(results, orders, sizes, args):
+    from app.utils import chunk_json_data
+
+    for n in sizes:
+        subset = orders[:n]
+        record(results, "chunk_json_data", measure(lambda: chunk_json_data(subset), repeats_for(n, args.repeat)), orders=n)
+
+
+def bench_extract_vehicle_filters(results, args):
+    from app.vehicle_filter import extract_vehicle_filters
+
+    for label, query in VEHICLE_QUERIES.items():
+        record(results, "extract_vehicle_filters", measure(lambda: extract_vehicle_filters(query), args.repeat),
+               query=label)
+
+
+def bench_filter_vehicles(results, fleet, sizes, args):
+    from app.vehicle_filter import extract_vehicle_filters, filter_vehicles
+
+    for n in sizes:
+        subset = fleet[:n]
+        for label, query in VEHICLE_QUERIES.items():
+            criteria = extract_vehicle_filters(query)
+            record(results, "filter_vehicles", measure(lambda: filter_vehicles(subset, criteria), repeats_for(n, args.repeat)),
+                   vehicles=n, query=label)
+
+
+def bench_format_vehicle_data(results, fleet, args):
+    from app.vehicle_formatter import format_vehicle_data
+
+    sample = fleet[:100]
+    for section in ["all", "speed", "location", "weather"]:
+        timing = measure(lambda: [format_vehicle_data(v, section) for v in sample], args.repeat)
+        # Report per vehicle
+        timing = {**timing, **{k: round(timing[k] / len(sample), 4) for k in ("median_ms", "p95_ms", "min_ms")},
+                  "runs": timing["runs"] * len(sample)}
+        record(results, "format_vehicle_data", timing, section=section)
+
+
+def bench_vector_search(results, sizes, args):
+    from app.vector_store import VectorStore
+
+    rng = np.random.default_rng(args.seed)
+    queries = rng.standard_normal((args.queries, EMBEDDING_DIM)).astype(np.float32)
+    for n in sizes:
+        embeddings = rng.standard_normal((n, EMBEDDING_DIM)).astype(np.float32)
+        texts = [f"orderno: ON{i:07d} || chunk {i}" for i in range(n)]
+        store = VectorStore(EMBEDDING_DIM)
+        store.attach(embeddings, texts)
+        query_iter = itertools.cycle(queries)
+
+        record(results, "VectorStore.search", measure(lambda: store.search(next(query_iter), top_k=5), args.repeat),
+               chunks=n, mode="store")
+        subset = texts[:: max(1, n // 100)][:100]
+        record(results, "VectorStore.search", measure(lambda: store.search(next(query_iter), top_k=5, chunks=subset),
+                                                      repeats_for(n, args.repeat)), chunks=n, mode="subset100")
+        del store, embeddings
+
+
+def index_paths(tmp: str) -> ExitStack:
+    """
+    Point every order cache path at a temp directory.
+    """
+    import app.order_loader as order_loader
+    import app.order_vector as order_vector
+
+    stack = ExitStack()
+    for module, attr, name in [
+        (order_vector, "ORDER_SNAPSHOT_PATH", "order_index.snap"),
+        (order_vector, "ORDER_CHECKSUM_PATH", "order_checksum.txt"),
+        (order_vector, "ORDER_EMBEDDINGS_PATH", "order_embeddings.npy"),
+        (order_vector, "ORDER_CHUNKS_PATH", "order_chunks.json"),
+        (order_loader, "ORDER_STATE_FILE", "order_state.json"),
+        (order_loader, "CHECKSUM_FILE", "order_checksum.txt"),
+        (order_loader, "ORDER_HASHES_FILE", "order_hashes.json"),
+    ]:
+        stack.enter_context(mock.patch.object(module, attr, os.path.join(tmp, name)))
+    # The stub embedder lives in this process, so keep rebuilds off the worker pool
+    stack.enter_context(mock.patch.object(order_vector, "BULK_EMBED_MIN_ORDERS", sys.maxsize))
+    return stack
+
+
+def bench_build_order_index(results, orders, sizes, args):
+    from app.order_loader import sync_orders, write_orders_json
+    from app.order_vector import build_order_index
+
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp, index_paths(tmp):
+            path = os.path.join(tmp, "orders.json")
+            subset = [dict(o) for o in orders[:n]]
+            write_orders_json(subset, path)
+
+            timing, (synced, diff) = measure_once(lambda: sync_orders(path))
+            record(results, "sync_orders", timing, orders=n, state="cold")
+            timing, _ = measure_once(lambda: build_order_index(orders=synced, diff=diff))
+            record(results, "build_order_index", timing, orders=n, state="cold")
+
+            # Unchanged data leaves nothing to update, so these can be sampled repeatedly
+            record(results, "sync_orders", measure(lambda: sync_orders(path), args.repeat), orders=n, state="unchanged")
+            synced, diff = sync_orders(path)
+            record(results, "build_order_index", measure(lambda: build_order_index(orders=synced, diff=diff), args.repeat),
+                   orders=n, state="cached")
+
+            for order in subset[:: 100]:
+                order["status_name"] = "Completed"
+                order["updated_at"] = datetime(2030, 1, 1).isoformat()
+            write_orders_json(subset, path)
+            timing, (synced, diff) = measure_once(lambda: sync_orders(path))
+            record(results, "sync_orders", timing, orders=n, state="1pct_changed")
+            timing, _ = measure_once(lambda: build_order_index(orders=synced, diff=diff))
+            record(results, "build_order_index", timing, orders=n, state="1pct_changed")
+
+
+def bench_endpoints(results, orders, fleet, args):
+    from fastapi.testclient import TestClient
+
+    import app.main as main
+    from app.order_loader import sync_orders, write_orders_json
+    from app.utils import chunk_json_data
+
+    n = args.e2e_orders
+    with tempfile.TemporaryDirectory() as tmp, index_paths(tmp):
+        path = os.path.join(tmp, "orders.json")
+        write_orders_json(orders[:n], path)
+        with mock.patch.object(main, "sync_orders", lambda source=None: sync_orders(path)), \
+                mock.patch.object(main, "get_order_source", lambda: None):
+            timing, _ = measure_once(main.init_order_pipeline)
+        record(results, "init_order_pipeline", timing, orders=n)
+
+        vehicles = fleet[:args.e2e_fleet]
+        # The lifespan is not entered, so the background initialization never runs
+        client = TestClient(main.app)
+        with mock.patch.object(main, "item_chunks", chunk_json_data(vehicles)), \
+                mock.patch.dict(main.startup_profile.components, {"vehicles": "ready"}):
+            for label, (query, chat_id) in CHAT_ORDER_REQUESTS.items():
+                payload = {"query": query.format(orderno=n // 2), "chat_id": chat_id}
+                if chat_id:
+                    # Prime the session so the follow-up has context to reuse
+                    client.post("/chat_order", json={"query": f"status of ON{n // 2:07d}", "chat_id": chat_id})
+                record(results, "POST /chat_order", measure(lambda: post_ok(client, "/chat_order", payload), args.repeat),
+                       orders=n, query=label)
+
+            for label, query in CHAT_REQUESTS.items():
+                payload = {"query": query}
+                record(results, "POST /chat", measure(lambda: post_ok(client, "/chat", payload), args.repeat),
+                       vehicles=len(vehicles), query=label)
+
+
+def post_ok(client, url: str, payload: dict):
+    response = client.post(url, json=payload)
+    if response.status_code != 200:
+        raise RuntimeError(f"❌ {url} returned {response.status_code}: {response.text[:200]}")
+    return response
+
+
+def run_cases(cases: set, orders: list[dict], fleet: list[dict], sizes: dict, args) -> tuple[dict, dict]:
+    """
+    Run the selected cases; return their results and the case each result key came from.
+    """
+    results, case_of = {}, {}
+    runners = {
+        "filter_orders": lambda: bench_filter_orders(results, orders, sizes["orders"], args),
+        "chunk_json_data": lambda: bench_chunk_json_data(results, orders, sizes["orders"], args),
+        "extract_vehicle_filters": lambda: bench_extract_vehicle_filters(results, args),
+        "filter_vehicles": lambda: bench_filter_vehicles(results, fleet, sizes["fleet"], args),
+        "format_vehicle_data": lambda: bench_format_vehicle_data(results, fleet, args),
+        "vector_search": lambda: bench_vector_search(results, sizes["vectors"], args),
+        "build_order_index": lambda: bench_build_order_index(results, orders, sizes["index"], args),
+        "endpoints": lambda: bench_endpoints(results, orders, fleet, args),
+    }
+    for case in CASES:
+        if case in cases:
+            runners[case]()
+            case_of.update({key: case for key in results if key not in case_of})
+    return results, case_of
+
+
+# === Baseline comparison ===
+def _spread(timing: dict) -> float:
+    # How far the typical sample of a case sat above its fastest; a single run
+    # says nothing about its noise, so it gets the full allowance
+    if timing["runs"] == 1:
+        return MAX_NOISE_ALLOWANCE
+    return min(MAX_NOISE_ALLOWANCE, timing["median_ms"] / timing["min_ms"] - 1) if timing["min_ms"] else 0.0
+
+
+def _speed(timing: dict, base: dict) -> float:
+    # How much slower the machine ran than when `base` was measured. A faster
+    # reference never tightens the gate: numpy and FAISS cases do not speed up
+    # with it the way pure-Python code does.
+    if timing.get("reference_ms") and base.get("reference_ms"):
+        return max(1.0, timing["reference_ms"] / base["reference_ms"])
+    return 1.0
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float, verbose: bool = True) -> list[str]:
+    """
+    Compare best-of-N times against the baseline and return the keys that regressed.
+
+    The minimum is compared because it is the least sensitive to noise from
+    other processes. Baseline times are scaled by the reference workload timed
+    alongside each case, and a case has to exceed the tolerance plus its own
+    measured spread (median over min, in either run) before it counts as a
+    regression.
+    """
+    regressions = []
+    shared = [key for key in results if key in baseline]
+    if verbose:
+        print(f"\n{'case':<64} {'baseline min':>12} {'current min':>12} {'speed':>6} {'change':>8} {'allowed':>8}")
+    for key in shared:
+        base_timing, timing = baseline[key], results[key]
+        speed = _speed(timing, base_timing)
+        base = base_timing["min_ms"] * speed
+        current = timing["min_ms"]
+        change = (current - base) / base if base else 0.0
+        allowed = tolerance + max(_spread(base_timing), _spread(timing))
+        regressed = current > base * (1 + allowed) and current - base > min_delta_ms
+        if regressed:
+            regressions.append(key)
+        if verbose:
+            print(f"{key:<64} {base_timing['min_ms']:>12.3f} {current:>12.3f} {speed:>6.2f} {change:>+8.1%} "
+                  f"{allowed:>8.0%}{'  ❌ REGRESSION' if regressed else ''}")
+
+    missing = [key for key in results if key not in baseline]
+    if missing and verbose:
+        print(f"ℹ️ {len(missing)} case(s) have no baseline yet (run with --update-baseline to record them).")
+    return regressions
+
+
+def load_baseline(path: str) -> dict | None:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(path: str, data: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the order and vehicle hot paths.")
+    parser.add_argument("--full", action="store_true", help="orders up to 5M, fleets up to 100k")
+    parser.add_argument("--orders", type=int, nargs="+")
+    parser.add_argument("--fleet", type=int, nargs="+")
+    parser.add_argument("--index-orders", type=int, nargs="+")
+    parser.add_argument("--vectors", type=int, nargs="+")
+    parser.add_argument("--e2e-orders", type=int, default=10_000)
+    parser.add_argument("--e2e-fleet", type=int, default=1_000)
+    parser.add_argument("--only", nargs="+", choices=CASES)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--geocoder-latency-ms", type=float, default=0.0)
+    parser.add_argument("--weather-latency-ms", type=float, default=0.0)
+    parser.add_argument("--out", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.005, help="ignore slowdowns smaller than this")
+    parser.add_argument("--confirm", type=int, default=2,
+                        help="re-measure regressed cases this many times before failing")
+    args = parser.parse_args()
+
+    sizes = dict(FULL_SIZES if args.full else DEFAULT_SIZES)
+    for name in sizes:
+        override = getattr(args, f"{name}_orders" if name == "index" else name)
+        if override:
+            sizes[name] = sorted(override)
+    cases = set(args.only or CASES)
+
+    print(f"🧪 Generating {max(sizes['orders'] + sizes['index'] + [args.e2e_orders])} orders "
+          f"and {max(sizes['fleet'] + [args.e2e_fleet])} vehicles (seed {args.seed})...")
+    orders = generate_orders(max(sizes["orders"] + sizes["index"] + [args.e2e_orders]), seed=args.seed)
+
+    baseline = None if args.update_baseline else load_baseline(args.baseline)
+    with stub_backends(
+        generate_fleet(max(sizes["fleet"] + [args.e2e_fleet]), seed=args.seed),
+        llm_latency_s=args.llm_latency_ms / 1000,
+        geocoder_latency_s=args.geocoder_latency_ms / 1000,
+        weather_latency_s=args.weather_latency_ms / 1000,
+    ) as stubs:
+        fleet = stubs.telemetry()
+        results, case_of = run_cases(cases, orders, fleet, sizes, args)
+        regressions = []
+        if baseline is not None:
+            regressions = compare(results, baseline["results"], args.tolerance, args.min_delta_ms, verbose=False)
+        for _ in range(args.confirm):
+            if not regressions:
+                break
+            rerun = [case for case in CASES if case in {case_of[key] for key in regressions}]
+            print(f"\n🔁 Re-measuring {', '.join(rerun)} to confirm {len(regressions)} possible regression(s)...")
+            retry, _ = run_cases(set(rerun), orders, fleet, sizes, args)
+            for key, timing in retry.items():
+                # Keep the faster of the two runs once both are scaled to the same machine speed
+                if key in results and timing["min_ms"] / _speed(timing, results[key]) < results[key]["min_ms"]:
+                    results[key] = timing
+            regressions = compare(results, baseline["results"], args.tolerance, args.min_delta_ms, verbose=False)
+        backend_calls = stubs.calls()
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "sizes": sizes,
+            "backend_calls": backend_calls,
+        },
+        "results": results,
+    }
+    write_json(args.out, report)
+    print(f"\n💾 Results written to {args.out}")
+
+    if args.update_baseline:
+        baseline = load_baseline(args.baseline) or {"meta": {}, "results": {}}
+        baseline["meta"] = report["meta"]
+        baseline["results"].update(results)
+        write_json(args.baseline, baseline)
+        print(f"📌 Baseline updated at {args.baseline}")
+        return
+
+    if baseline is None:
+        print(f"⚠️ No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return
+
+    regressions = compare(results, baseline["results"], args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark regression(s) beyond the allowed slowdown:")
+        for key in regressions:
+            print(f"   - {key}")
+        sys.exit(1)
+    print("\n✅ No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# benchmarks/stubs.py
+#
+# In-process stand-ins for the external backends (Gemini, the Nominatim
+# geocoder, the weather API, the telemetry API and the sentence embedding
+# model) so benchmarks time this repo's code rather than the network or a GPU.
+# Each stub can add a fixed latency to model a real backend.
+
+import hashlib
+import os
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+
+# app.llm_wrapper refuses to import without a key; the stub never uses it
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-stub")
+
+EMBEDDING_DIM = 768
+
+
+class _Text:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubChat:
+    def __init__(self, llm):
+        self.llm = llm
+
+    def send_message(self, message: str):
+        return self.llm.generate_content(message)
+
+
+class StubLLM:
+    """
+    Mimics the Gemini GenerativeModel calls used by app.llm_wrapper.
+    """
+
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def generate_content(self, prompt: str):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return _Text(f"Stub answer based on {len(prompt)} prompt characters.")
+
+    def start_chat(self):
+        return StubChat(self)
+
+
+class _Location:
+    def __init__(self, address: str):
+        self.address = address
+
+
+class StubGeocoder:
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.calls = 0
+
+    def reverse(self, point, exactly_one=True, language="en"):
+        self.calls += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        lat, lng = point
+        return _Location(f"Stub Street, {lat:.3f}, {lng:.3f}, Saudi Arabia")
+
+
+class StubWeather:
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.calls = 0
+
+    def __call__(self, lat, lon, days=1):
+        self.calls += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return {
+            "location": {"localtime": "2024-06-01 14:05"},
+            "current": {
+                "condition": {"text": "Sunny"}, "temp_c": 38.0, "wind_kph": 14.4,
+                "humidity": 12, "vis_km": 10.0,
+            },
+        }
+
+
+class StubTelemetry:
+    """
+    Serves a pre-generated fleet in place of the live vehicle API.
+    """
+
+    def __init__(self, fleet: list[dict], latency_s: float = 0.0):
+        self.fleet = fleet
+        self.latency_s = latency_s
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return self.fleet
+
+
+class StubEmbedder:
+    """
+    Deterministic hash-seeded unit vectors with the real model's dimension;
+    identical texts always map to the same vector.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def _vector(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:8], "little")
+        vec = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return vec / np.linalg.norm(vec)
+
+    def embed(self, texts):
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack([self._vector(t) for t in texts])
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+class FrozenDatetime(datetime):
+    """
+    `datetime` whose now() is fixed, so date-range filters see the synthetic
+    data's year whatever day the benchmark runs.
+    """
+
+    @classmethod
+    def now(cls, tz=None):
+        from benchmarks.synthetic import REFERENCE_NOW
+
+        return cls.fromtimestamp(REFERENCE_NOW.timestamp(), tz)
+
+
+class StubBackends:
+    def __init__(self, llm: StubLLM, geocoder: StubGeocoder, weather: StubWeather,
+                 telemetry: StubTelemetry, embedder: StubEmbedder):
+        self.llm = llm
+        self.geocoder = geocoder
+        self.weather = weather
+        self.telemetry = telemetry
+        self.embedder = embedder
+
+    def calls(self) -> dict:
+        return {
+            "llm": self.llm.calls, "geocoder": self.geocoder.calls,
+            "weather": self.weather.calls, "telemetry": self.telemetry.calls,
+        }
+
+
+@contextmanager
+def stub_backends(fleet=None, llm_latency_s: float = 0.0, geocoder_latency_s: float = 0.0,
+                  weather_latency_s: float = 0.0, telemetry_latency_s: float = 0.0):
+    """
+    Patch every external backend, and pin the order filter clock to the
+    synthetic data's REFERENCE_NOW, for the duration of the block.
+    """
+    import app.embedder
+    import app.external_api_loader
+    import app.llm_wrapper
+    import app.order_filter
+    import app.vehicle_formatter
+
+    stubs = StubBackends(
+        StubLLM(llm_latency_s), StubGeocoder(geocoder_latency_s), StubWeather(weather_latency_s),
+        StubTelemetry(fleet or [], telemetry_latency_s), StubEmbedder(),
+    )
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(app.llm_wrapper, "gemini_model", stubs.llm))
+        stack.enter_context(mock.patch.object(app.vehicle_formatter, "geolocator", stubs.geocoder))
+        stack.enter_context(mock.patch.object(app.vehicle_formatter, "get_weather_data", stubs.weather))
+        stack.enter_context(mock.patch.object(app.external_api_loader, "get_live_vehicle_data", stubs.telemetry))
+        stack.enter_context(mock.patch.object(app.embedder, "embedder_instance", stubs.embedder))
+        stack.enter_context(mock.patch.object(app.order_filter, "datetime", FrozenDatetime))
+        yield stubs
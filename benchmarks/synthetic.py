@@ -0,0 +1,97 @@
+# benchmarks/synthetic.py
+#
+# Seeded generators for synthetic orders and vehicle fleets shaped like
+# app/data/orders.json and app/data/cached_trucks.json. The same seed always
+# yields the same records, so benchmark runs are comparable. Dates are laid
+# out from a fixed EPOCH rather than today; the benchmarks pin the app's clock
+# to REFERENCE_NOW so relative filters ("this month") still hit the data.
+
+import random
+from datetime import datetime, timedelta
+
+STATUSES = ["Completed", "In Progress", "Cancelled", "Pending"]
+BRANCHES = ["Riyadh", "Jeddah", "Dammam", "Mecca", "Medina"]
+MATERIALS = ["Sand", "Cement", "Gravel", "Steel", "Asphalt"]
+FUEL_TYPES = ["diesel", "petrol", "electric"]
+DRIVER_NAMES = ["Ali Khan", "Omar Saleh", "Yusuf Haddad", "Fahad Noor", "Khalid Aziz", "Samir Rahman"]
+ALARMS = [None, None, None, "hardCornering", "harshBraking", "overspeed"]
+PLATE_LETTERS = "ABDEGHJKLNRSTUVXZ"
+
+EPOCH = datetime(2024, 1, 1)
+REFERENCE_NOW = EPOCH + timedelta(days=365)
+
+# Rough bounding box around the Gulf region the sample data comes from
+LAT_RANGE = (16.0, 32.0)
+LNG_RANGE = (36.0, 56.0)
+
+
+def iter_orders(n: int, seed: int = 42, start: datetime | None = None):
+    """
+    Yield `n` order records lazily; created_at spans the year after `start`
+    (EPOCH by default).
+    """
+    rng = random.Random(seed)
+    start = start or EPOCH
+    for i in range(1, n + 1):
+        created = start + timedelta(minutes=rng.randint(0, 525_600))
+        yield {
+            "id": i,
+            "orderno": f"ON{i:07d}",
+            "qty": rng.randint(1, 100),
+            "status_name": rng.choice(STATUSES),
+            "branch_name": rng.choice(BRANCHES),
+            "material_name": rng.choice(MATERIALS),
+            "created_at": created.isoformat(timespec="seconds"),
+            "updated_at": (created + timedelta(hours=rng.randint(0, 72))).isoformat(timespec="seconds"),
+        }
+
+
+def generate_orders(n: int, seed: int = 42, start: datetime | None = None) -> list[dict]:
+    return list(iter_orders(n, seed, start))
+
+
+def iter_fleet(n: int, seed: int = 42):
+    """
+    Yield `n` vehicles with a profile, driver, counters and a last telemetry update.
+    """
+    rng = random.Random(seed)
+    for i in range(1, n + 1):
+        moving = rng.random() < 0.6
+        alarm = rng.choice(ALARMS)
+        ch_params = {
+            "ePwrV": {"v": rng.randint(11_500, 28_500)},
+            "iPwrV": {"v": rng.randint(3_700, 4_200)},
+        }
+        if alarm:
+            ch_params["alarm"] = {"v": alarm}
+        yield {
+            "name": f"{1000 + i} {''.join(rng.choice(PLATE_LETTERS) for _ in range(3))}",
+            "last_update": {
+                "spd": rng.randint(5, 140) if moving else 0,
+                "ang": rng.randint(0, 359),
+                "alt": rng.randint(0, 900),
+                "lat": round(rng.uniform(*LAT_RANGE), 6),
+                "lng": round(rng.uniform(*LNG_RANGE), 6),
+                "acc": 1 if moving else rng.randint(0, 1),
+                "ip": f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                "chPrams": ch_params,
+            },
+            "driver": {
+                "name": rng.choice(DRIVER_NAMES),
+                "phone": f"+9665{rng.randint(10_000_000, 99_999_999)}",
+            },
+            "profile": {
+                "fuel_type": rng.choice(FUEL_TYPES),
+                "plate_number": f"{''.join(rng.choice(PLATE_LETTERS) for _ in range(3))}{rng.randint(1000, 9999)}",
+                "seats": rng.choice([2, 3, 5]),
+            },
+            "counters": {
+                "odometer": rng.randint(1_000, 900_000),
+                "engine_hours": rng.randint(0, 20_000) * 3600,
+            },
+            "_location_str": f"{rng.choice(BRANCHES)}, Saudi Arabia",
+        }
+
+
+def generate_fleet(n: int, seed: int = 42) -> list[dict]:
+    return list(iter_fleet(n, seed))
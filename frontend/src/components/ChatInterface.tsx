@@ -67,7 +67,7 @@ const ChatInterface: React.FC = () => {
       
       const response = await axios.post<{ response: string | string[] }>(
         `${API_URL}${endpoint}`,
-        { query: content },
+        { query: content, chat_id: sessionId },
         {
           headers: {
             'Content-Type': 'application/json',
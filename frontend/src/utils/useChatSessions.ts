@@ -11,18 +11,48 @@ interface Session {
   messages: Message[];
 }
 
-async function fetchTitleFromAPI(message: string): Promise<string> {
+interface TitleResponse {
+  title: string;
+  title_id?: string;
+  final?: boolean;
+}
+
+const TITLE_API_URL = 'http://localhost:8000/generate_title';
+const TITLE_POLL_INTERVAL_MS = 1500;
+const TITLE_POLL_ATTEMPTS = 5;
+
+async function fetchTitleFromAPI(
+  message: string,
+  onUpgrade: (title: string) => void
+): Promise<string> {
   try {
-    const response = await axios.post<{ title: string }>('http://localhost:8000/generate_title', {
-      message,
-    });
-    return response.data.title || '';
+    const response = await axios.post<TitleResponse>(TITLE_API_URL, { message });
+    const { title, title_id, final } = response.data;
+    if (title_id && !final) {
+      pollTitleUpgrade(title_id, onUpgrade);
+    }
+    return title || '';
   } catch (error) {
     console.error('Failed to fetch title from API:', error);
     return '';
   }
 }
 
+async function pollTitleUpgrade(titleId: string, onUpgrade: (title: string) => void) {
+  for (let attempt = 0; attempt < TITLE_POLL_ATTEMPTS; attempt++) {
+    await new Promise((resolve) => setTimeout(resolve, TITLE_POLL_INTERVAL_MS));
+    try {
+      const response = await axios.get<TitleResponse>(`${TITLE_API_URL}/${titleId}`);
+      if (response.data.final) {
+        if (response.data.title) onUpgrade(response.data.title);
+        return;
+      }
+    } catch {
+      return;
+    }
+  }
+}
+
 export function useChatSessions() {
   const [sessions, setSessions] = useState<Session[]>([]);
   const [activeSessionId, setActiveSessionId] = useState<string | null>(null);
@@ -74,7 +104,7 @@ export function useChatSessions() {
           message.sender === 'user' && session.messages.length === 0;
 
         if (isFirstUserMessage) {
-          fetchTitleFromAPI(message.content).then((newTitle) => {
+          const applyTitle = (newTitle: string) => {
             setSessions((current) =>
               current.map((s, i) =>
                 s.id === session.id
@@ -85,7 +115,8 @@ export function useChatSessions() {
                   : s
               )
             );
-          });
+          };
+          fetchTitleFromAPI(message.content, applyTitle).then(applyTitle);
         }
 
         return {
@@ -0,0 +1,6 @@
+# tests/conftest.py
+
+import os
+
+# app.llm_wrapper refuses to import without a key; tests never call Gemini
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
@@ -0,0 +1,121 @@
+# tests/test_bulk_embedder.py
+
+import hashlib
+import os
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+import app.bulk_embedder as bulk_embedder
+from app.bulk_embedder import BulkEmbeddingJob
+
+DIM = 8
+
+
+class StubEncoder:
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts, batch_size=None, convert_to_numpy=True, show_progress_bar=False):
+        self.encoded += len(texts)
+        return np.stack([stub_vector(text) for text in texts])
+
+
+def stub_vector(text: str) -> np.ndarray:
+    seed = int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:4], "little")
+    return np.random.default_rng(seed).normal(size=DIM).astype(np.float32)
+
+
+class InlineExecutor:
+    """
+    Runs shards in the test process with the stub encoder instead of spawning
+    SentenceTransformer workers.
+    """
+
+    def __init__(self, max_workers=None, mp_context=None, initializer=None, initargs=()):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def encoder(monkeypatch):
+    encoder = StubEncoder()
+    monkeypatch.setattr(bulk_embedder, "_encoder", encoder)
+    monkeypatch.setattr(bulk_embedder, "ProcessPoolExecutor", InlineExecutor)
+    return encoder
+
+
+@pytest.fixture
+def texts():
+    # Duplicates spread over several shards exercise the reassembly order
+    return [f"order {i % 23} || status: {'open' if i % 3 else 'closed'}" for i in range(100)]
+
+
+def make_job(texts, checkpoint_dir, progress=None):
+    return BulkEmbeddingJob(texts, workers=2, shard_size=8, checkpoint_dir=str(checkpoint_dir),
+                            progress=progress or (lambda done, total, elapsed: None))
+
+
+def test_output_matches_single_pass_in_chunk_order(encoder, texts, tmp_path):
+    job = make_job(texts, tmp_path / "checkpoint")
+    embeddings = job.run().to_array()
+
+    assert embeddings.shape == (len(texts), DIM)
+    np.testing.assert_array_equal(embeddings, np.stack([stub_vector(t) for t in texts]))
+    # Identical texts are encoded once
+    assert encoder.encoded == len(set(texts)) == job.stats["unique_chunks"]
+    blocks = list(job.run().iter_blocks())
+    assert sum(len(b) for b in blocks) == len(texts)
+
+
+def test_interrupted_job_resumes_from_checkpointed_shards(encoder, texts, tmp_path):
+    checkpoint = tmp_path / "checkpoint"
+
+    def kill_after_first_shard(done, total, elapsed):
+        raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        make_job(texts, checkpoint, kill_after_first_shard).run()
+    saved = [name for name in os.listdir(checkpoint) if name.startswith("shard_")]
+    assert len(saved) == 1 and saved[0].endswith(".npy")
+    resumed_rows = len(np.load(checkpoint / saved[0]))
+
+    encoder.encoded = 0
+    job = make_job(texts, checkpoint)
+    embeddings = job.run().to_array()
+
+    assert job.stats["resumed_shards"] == 1
+    assert encoder.encoded == len(set(texts)) - resumed_rows
+    np.testing.assert_array_equal(embeddings, np.stack([stub_vector(t) for t in texts]))
+
+    job.cleanup()
+    assert not checkpoint.exists()
+
+
+def test_changed_corpus_discards_old_checkpoints(encoder, texts, tmp_path):
+    checkpoint = tmp_path / "checkpoint"
+    make_job(texts, checkpoint).run()
+
+    encoder.encoded = 0
+    changed = [text + " (edited)" for text in texts]
+    job = make_job(changed, checkpoint)
+    embeddings = job.run().to_array()
+
+    assert job.stats["resumed_shards"] == 0
+    np.testing.assert_array_equal(embeddings, np.stack([stub_vector(t) for t in changed]))
+    assert not [name for name in os.listdir(checkpoint) if name.endswith(".tmp")]
@@ -0,0 +1,70 @@
+# tests/test_chat_session.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.chat_session as chat_session
+import app.main as main
+from app.chat_session import SessionStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    class Clock:
+        now = 1000.0
+
+        def __call__(self):
+            return self.now
+
+    clock = Clock()
+    monkeypatch.setattr(chat_session.time, "monotonic", clock)
+    return clock
+
+
+def test_requests_without_chat_id_get_no_session():
+    assert SessionStore().get(None) is None
+    assert SessionStore().get("") is None
+
+
+def test_lru_eviction_at_max_entries(clock):
+    store = SessionStore(max_entries=3, idle_ttl=60)
+    a = store.get("a")
+    store.get("b")
+    store.get("c")
+    # Touching "a" makes "b" the least recently used
+    assert store.get("a") is a
+    store.get("d")
+
+    assert len(store) == 3
+    assert store.get("a") is a
+    assert not store.drop("b")
+    assert store.drop("c") and store.drop("d")
+
+
+def test_idle_sessions_expire(clock):
+    store = SessionStore(max_entries=10, idle_ttl=60)
+    old = store.get("old")
+    old.remember(["orderno: ON0000001"], orderno="ON0000001")
+    clock.now += 30
+    store.get("recent")
+
+    clock.now += 31
+    assert store.evict_idle() == 1
+    assert len(store) == 1
+
+    # An expired chat id starts over with an empty session
+    fresh = store.get("old")
+    assert fresh is not old and not fresh.has_context()
+    clock.now += 61
+    assert store.evict_idle() == 2 and len(store) == 0
+
+
+def test_delete_session_endpoint(monkeypatch):
+    store = SessionStore()
+    monkeypatch.setattr(main, "session_store", store)
+    store.get("chat-1").remember(["context"])
+    client = TestClient(main.app)
+
+    assert client.delete("/session/chat-1").json() == {"status": "cleared"}
+    assert len(store) == 0
+    assert client.delete("/session/chat-1").json() == {"status": "not_found"}
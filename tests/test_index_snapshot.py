@@ -0,0 +1,109 @@
+# tests/test_index_snapshot.py
+
+import json
+
+import numpy as np
+import pytest
+
+from app.index_snapshot import HEADER_STRUCT, META_SECTION, SnapshotError, load_snapshot, write_snapshot
+
+
+def _snapshot(tmp_path, **kwargs):
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((5, 8)).astype(np.float32)
+    chunks = ["orderno: ON0000001 || status: Completed", "", "naïve · ünïcode", "x" * 1000, "last"]
+    path = write_snapshot(str(tmp_path / "index.snap"), embeddings, chunks, **kwargs)
+    return path, embeddings, chunks
+
+
+def test_round_trip(tmp_path):
+    path, embeddings, chunks = _snapshot(
+        tmp_path, columns={"record_id": ["1", "2", "3", "4", "5"]}, meta={"source_checksum": "abc"},
+        extra_sections={"extra": b"\x00\x01payload"},
+    )
+    snapshot = load_snapshot(path)
+
+    assert (snapshot.n_chunks, snapshot.dim) == (5, 8)
+    np.testing.assert_array_equal(snapshot.embeddings, embeddings)
+    assert list(snapshot.chunks) == chunks
+    assert snapshot.chunks[-1] == "last"
+    assert snapshot.chunks[1:3] == chunks[1:3]
+    assert snapshot.columns == {"record_id": ["1", "2", "3", "4", "5"]}
+    assert snapshot.meta["source_checksum"] == "abc"
+    assert snapshot.section_bytes("extra") == b"\x00\x01payload"
+    assert bytes(snapshot.section_view("extra")) == b"\x00\x01payload"
+    assert snapshot.section_bytes("missing") is None
+
+
+def test_block_source_matches_array(tmp_path):
+    class Blocks:
+        def __init__(self, array):
+            self.array = array
+            self.shape = array.shape
+
+        def iter_blocks(self):
+            for start in range(0, len(self.array), 2):
+                yield self.array[start:start + 2]
+
+    path, embeddings, chunks = _snapshot(tmp_path)
+    streamed = write_snapshot(str(tmp_path / "streamed.snap"), Blocks(embeddings), chunks)
+    with open(path, "rb") as a, open(streamed, "rb") as b:
+        # Only the created_at timestamp in the meta section may differ
+        assert len(a.read()) == len(b.read())
+    np.testing.assert_array_equal(load_snapshot(streamed).embeddings, embeddings)
+
+
+def test_corrupted_body_fails_checksum(tmp_path):
+    path, _, _ = _snapshot(tmp_path)
+    offset, _ = load_snapshot(path).sections["embeddings"]
+    with open(path, "r+b") as f:
+        f.seek(offset + 3)
+        byte = f.read(1)
+        f.seek(-1, 1)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    with pytest.raises(SnapshotError, match="checksum"):
+        load_snapshot(path, verify=True)
+    # Verification is opt-in, so workers don't hash the whole file on every open
+    assert load_snapshot(path).n_chunks == 5
+
+
+def test_rejects_foreign_and_truncated_files(tmp_path):
+    path = tmp_path / "not-a-snapshot"
+    path.write_bytes(b"x" * HEADER_STRUCT.size)
+    with pytest.raises(SnapshotError, match="not an index snapshot"):
+        load_snapshot(str(path))
+
+    path.write_bytes(b"short")
+    with pytest.raises(SnapshotError, match="truncated"):
+        load_snapshot(str(path))
+
+
+def test_mismatched_lengths(tmp_path):
+    with pytest.raises(SnapshotError):
+        write_snapshot(str(tmp_path / "bad.snap"), np.zeros((2, 4), dtype=np.float32), ["only one"])
+    assert not list(tmp_path.iterdir())
+
+
+def test_columns_are_binary_sections(tmp_path):
+    ordernos = ["ON0000001", None, "", "ÖN4", None]
+    path, _, _ = _snapshot(tmp_path, columns={"orderno": ordernos, "record_id": ["1", "2", "3", "4", "5"]})
+    snapshot = load_snapshot(path)
+
+    assert "columns" not in json.loads(snapshot.section_bytes(META_SECTION))
+    assert list(snapshot.columns["orderno"]) == ordernos
+    assert snapshot.columns["orderno"][1] is None and snapshot.columns["orderno"][2] == ""
+    assert snapshot.columns["orderno"][-2:] == ["ÖN4", None]
+    assert snapshot.columns["record_id"][3] == "4"
+
+
+def test_legacy_meta_columns_still_load(tmp_path):
+    path, _, _ = _snapshot(tmp_path, meta={"columns": {"record_id": ["1", "2", "3", "4", "5"]}})
+    assert load_snapshot(path).columns == {"record_id": ["1", "2", "3", "4", "5"]}
+
+
+def test_rejects_bad_columns_and_section_names(tmp_path):
+    with pytest.raises(SnapshotError, match="one value per chunk"):
+        _snapshot(tmp_path, columns={"orderno": ["ON1"]})
+    with pytest.raises(SnapshotError, match="longer than 16 bytes"):
+        _snapshot(tmp_path, extra_sections={"a-very-long-section-name": b""})
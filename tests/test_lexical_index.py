@@ -0,0 +1,56 @@
+# tests/test_lexical_index.py
+
+import numpy as np
+
+from app.lexical_index import BM25Index
+
+TEXTS = [
+    "orderno: ON0000001 || status: Completed || material: Sand || branch: Jeddah",
+    "orderno: ON0000002 || status: Pending || material: Cement || branch: Riyadh",
+    "orderno: ON0000003 || status: Completed || material: Gravel || branch: Dammam",
+    "orderno: ON0000004 || status: Cancelled || material: Sand || branch: Riyadh",
+    "orderno: ON0000005 || status: Pending || material: Steel || branch: Jeddah",
+]
+
+
+def assert_same_index(actual: BM25Index, expected: BM25Index):
+    assert actual.vocab == expected.vocab
+    assert actual.n_docs == expected.n_docs
+    np.testing.assert_array_equal(actual.offsets, expected.offsets)
+    np.testing.assert_array_equal(actual.doc_ids, expected.doc_ids)
+    np.testing.assert_array_equal(actual.tfs, expected.tfs)
+    np.testing.assert_array_equal(actual.doc_lens, expected.doc_lens)
+    for query in ["sand jeddah", "pending", "ON0000004", "completed gravel dammam"]:
+        assert actual.search(query, top_k=3) == expected.search(query, top_k=3)
+
+
+def test_apply_matches_build_after_add_change_delete():
+    index = BM25Index.build(TEXTS)
+
+    # Delete doc 1, change doc 3 (re-added at the end) and add a new order
+    changed = TEXTS[3].replace("Cancelled", "Completed").replace("Sand", "Asphalt")
+    added = "orderno: ON0000006 || status: Pending || material: Asphalt || branch: Mecca"
+    keep = [0, 2, 4]
+    updated = index.apply(keep, [changed, added])
+
+    assert_same_index(updated, BM25Index.build([TEXTS[i] for i in keep] + [changed, added]))
+
+
+def test_apply_without_changes_and_to_empty():
+    index = BM25Index.build(TEXTS)
+    assert_same_index(index.apply(list(range(len(TEXTS))), []), index)
+
+    empty = index.apply([], [])
+    assert empty.n_docs == 0 and empty.vocab == []
+    assert empty.search("sand") == []
+
+
+def test_buffer_round_trip():
+    index = BM25Index.build(TEXTS)
+    assert_same_index(BM25Index.from_buffer(memoryview(index.to_bytes())), index)
+
+
+def test_search_ranks_exact_identifier_first():
+    index = BM25Index.build(TEXTS)
+    assert index.search("ON0000002")[0][0] == 1
+    assert index.search("the of and") == []
@@ -0,0 +1,66 @@
+# tests/test_main.py
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main.startup_profile, "components", {"vehicles": "pending"})
+    monkeypatch.setattr(main, "rag", None)
+    monkeypatch.setattr(main, "raw_items", [])
+    monkeypatch.setattr(main, "item_chunks", ["vehicle 1"])
+    monkeypatch.setattr(main, "run_llm_query", lambda query, chunks, session=None: f"answer from {len(chunks)} chunks")
+    monkeypatch.setattr(main, "load_vehicle_data", lambda: (None, [{"id": 1}], ["vehicle 1"]))
+    # The lifespan is not entered, so the background initialization never runs
+    return TestClient(main.app)
+
+
+def test_chat_waits_for_vehicle_data(client):
+    response = client.post("/chat", json={"query": "moving trucks"})
+    assert response.json() == {"response": ["⚠️ Vehicle data not loaded yet."]}
+
+    main.startup_profile.set_component("vehicles", "ready")
+    response = client.post("/chat", json={"query": "moving trucks"})
+    assert response.json() == {"response": ["answer from 1 chunks"]}
+
+
+def test_refresh_rejected_while_vehicles_load(client):
+    with main.vehicle_lock:
+        response = client.post("/refresh")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+
+
+def test_refresh_marks_vehicles_ready(client):
+    response = client.post("/refresh")
+    assert response.json() == {"status": "refreshed", "total_items": 1}
+    assert main.startup_profile.components["vehicles"] == "ready"
+
+
+def test_orders_ready_only_after_embedder_warm_up(monkeypatch):
+    import app.rag_engine as rag_engine
+    from app.order_loader import OrderDiff
+
+    statuses = []
+
+    class StubEmbedder:
+        def embed_query(self, text):
+            statuses.append(main.startup_profile.components["orders"])
+            return [0.0]
+
+    monkeypatch.setattr(main.startup_profile, "components", {})
+    monkeypatch.setattr(main, "sync_orders", lambda source=None: ([], OrderDiff()))
+    monkeypatch.setattr(main, "get_order_source", lambda: None)
+    monkeypatch.setattr(main, "build_order_index", lambda orders=None, diff=None: (None, [], None))
+    monkeypatch.setattr(main, "order_rag", None)
+    monkeypatch.setattr(main, "order_chunks", [])
+    monkeypatch.setattr(rag_engine, "get_embedder", StubEmbedder)
+
+    asyncio.run(main.run_component("orders", main.init_order_pipeline))
+    assert statuses == ["loading"]
+    assert main.startup_profile.components["orders"] == "ready"
@@ -0,0 +1,125 @@
+# tests/test_metrics.py
+
+import re
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.metrics as app_metrics
+from app.metrics import LATENCY_BUCKETS, MetricsRegistry, RequestTimingMiddleware, span, traced
+
+SAMPLE_LINE = re.compile(r'^[a-z_]+(\{([a-z_]+="([^"\\]|\\.)*",?)*\})? -?[0-9.e+-]+$')
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry(enabled=True)
+
+
+@pytest.fixture
+def client(registry):
+    api = FastAPI()
+    api.add_middleware(RequestTimingMiddleware, registry=registry)
+
+    @api.get("/items/{item_id}")
+    def item(item_id: str):
+        with registry.span("lookup"):
+            with registry.span("lookup"):
+                pass
+        with registry.span("format.row"):
+            pass
+        return {"id": item_id}
+
+    return TestClient(api)
+
+
+def test_exposition_format(registry):
+    registry.observe_stage("faiss", 0.003)
+    registry.observe_stage("faiss", 42.0)
+    registry.observe_request("POST", "/chat", 200, 0.2)
+    registry.record_cache("title", True)
+    registry.record_cache("title", False)
+    registry.record_cache("title", True)
+    registry.set_gauge("index_chunks", "Chunks in the search index.", lambda: 12, index='or"ders')
+    registry.set_gauge("broken", "Raises at scrape time.", lambda: 1 / 0)
+
+    text = registry.render()
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    for line in lines:
+        assert line.startswith("# HELP ") or line.startswith("# TYPE ") or SAMPLE_LINE.match(line), line
+
+    buckets = [int(line.rsplit(" ", 1)[1]) for line in lines
+               if line.startswith('assistant_stage_duration_seconds_bucket{stage="faiss"')]
+    assert len(buckets) == len(LATENCY_BUCKETS) + 1
+    assert buckets == sorted(buckets)
+    assert buckets[0] == 0 and buckets[1] == 1 and buckets[-2] == 1 and buckets[-1] == 2
+    assert 'assistant_stage_duration_seconds_count{stage="faiss"} 2' in lines
+    assert 'assistant_stage_duration_seconds_sum{stage="faiss"} 42.003000' in lines
+    assert 'assistant_http_request_duration_seconds_count{method="POST",path="/chat",status="200"} 1' in lines
+
+    assert 'assistant_cache_requests_total{cache="title",result="hit"} 2' in lines
+    assert 'assistant_cache_hit_ratio{cache="title"} 0.666667' in lines
+    assert "# TYPE assistant_index_chunks gauge" in lines
+    assert 'assistant_index_chunks{index="or\\"ders"} 12.0' in lines
+    # A failing gauge is skipped rather than breaking the scrape
+    assert not [line for line in lines if line.startswith("assistant_broken")]
+
+
+def test_middleware_labels_route_templates_and_sets_server_timing(client, registry):
+    response = client.get("/items/42")
+    assert response.json() == {"id": "42"}
+
+    header = response.headers["server-timing"]
+    stages = dict(part.split(";dur=") for part in header.split(", "))
+    assert list(stages) == ["lookup", "format-row", "total"]
+    assert all(float(value) >= 0 for value in stages.values())
+
+    client.get("/items/7")
+    client.get("/nowhere")
+    assert registry.http_latency[("GET", "/items/{item_id}", "200")].count == 2
+    assert registry.http_latency[("GET", "unmatched", "404")].count == 1
+    # Nested spans of the same stage are each observed and accumulate in the trace
+    assert registry.stage_latency["lookup"].count == 4
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    assert registry.span("faiss") is app_metrics._NOOP_SPAN
+    with registry.span("faiss"):
+        pass
+    registry.record_cache("title", True)
+    assert not registry.stage_latency and not registry.cache_requests
+
+
+def test_span_and_traced_are_no_ops_when_disabled(monkeypatch):
+    monkeypatch.setattr(app_metrics.metrics, "enabled", False)
+
+    def fn(x):
+        return x * 2
+
+    assert traced("stage")(fn) is fn
+    assert span("stage") is app_metrics._NOOP_SPAN
+
+
+def test_traced_records_a_span_when_enabled(monkeypatch):
+    registry = MetricsRegistry(enabled=True)
+    monkeypatch.setattr(app_metrics, "metrics", registry)
+
+    @traced("orders.index")
+    def build(x):
+        return x + 1
+
+    assert build(1) == 2
+    assert build.__name__ == "build"
+    assert registry.stage_latency["orders.index"].count == 1
+
+
+def test_metrics_endpoint_serves_the_exposition():
+    import app.main as main
+
+    response = TestClient(main.app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE assistant_stage_duration_seconds histogram" in response.text
@@ -0,0 +1,76 @@
+# tests/test_order_db.py
+
+import sqlite3
+
+import pytest
+
+import app.order_loader as order_loader
+from app.order_db import OrderDatabaseSource
+from app.order_loader import iter_raw_orders, sync_orders
+
+INSERT = "INSERT INTO orders VALUES (?, ?, ?, ?)"
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(order_loader, "ORDER_STATE_FILE", str(tmp_path / "order_state.json"))
+    monkeypatch.setattr(order_loader, "CHECKSUM_FILE", str(tmp_path / "order_checksum.txt"))
+    monkeypatch.setattr(order_loader, "ORDER_HASHES_FILE", str(tmp_path / "order_hashes.json"))
+    path = str(tmp_path / "orders.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, orderno TEXT, status_name TEXT, updated_at TEXT)")
+    conn.executemany(INSERT, [
+        (1, "ON0000001", "Pending", "2024-01-01T10:00:00"),
+        (2, "ON0000002", "Pending", "2024-01-02T10:00:00"),
+        (3, "ON0000003", "Completed", "2024-01-03T10:00:00"),
+    ])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def _source(conn, batch_size: int = 2) -> OrderDatabaseSource:
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    return OrderDatabaseSource(lambda: sqlite3.connect(path, check_same_thread=False),
+                               batch_size=batch_size, paramstyle="qmark", server_side=False)
+
+
+def test_incremental_sync_diff(db, tmp_path):
+    orders_path = str(tmp_path / "orders.json")
+    source = _source(db)
+
+    orders, diff = sync_orders(orders_path, source=source)
+    assert [o["id"] for o in orders] == [1, 2, 3]
+    assert (diff.added, diff.changed, diff.deleted) == (["1", "2", "3"], [], [])
+
+    # Update a row, delete a row, and add rows sharing the current watermark timestamp
+    db.execute("UPDATE orders SET status_name = 'Completed', updated_at = '2024-01-04T10:00:00' WHERE id = 1")
+    db.execute("DELETE FROM orders WHERE id = 2")
+    db.executemany(INSERT, [
+        (4, "ON0000004", "Pending", "2024-01-03T10:00:00"),
+        (5, "ON0000005", "Pending", "2024-01-04T10:00:00"),
+    ])
+    db.commit()
+
+    orders, diff = sync_orders(orders_path, source=source)
+    assert sorted(diff.added) == ["4", "5"]
+    assert diff.changed == ["1"]
+    assert diff.deleted == ["2"]
+    by_id = {o["id"]: o for o in iter_raw_orders(orders_path)}
+    assert sorted(by_id) == [1, 3, 4, 5]
+    assert by_id[1]["status_name"] == "Completed"
+
+    # Nothing new: the tied rows at the watermark are re-read but hash the same
+    _, diff = sync_orders(orders_path, source=source)
+    assert not diff.has_changes
+
+
+def test_rows_at_watermark_are_not_missed(db, tmp_path):
+    orders_path = str(tmp_path / "orders.json")
+    source = _source(db, batch_size=1)
+    sync_orders(orders_path, source=source)
+
+    db.execute(INSERT, (6, "ON0000006", "Pending", "2024-01-03T10:00:00"))
+    db.commit()
+    _, diff = sync_orders(orders_path, source=source)
+    assert (diff.added, diff.changed, diff.deleted) == (["6"], [], [])
@@ -0,0 +1,116 @@
+# tests/test_order_loader.py
+
+import json
+
+import pytest
+
+import app.order_loader as order_loader
+from app.order_loader import diff_order_hashes, iter_raw_orders, sync_orders, write_orders_json
+
+
+def _orders(n: int, note_size: int = 0) -> list[dict]:
+    return [{"id": i, "orderno": f"ON{i:07d}", "status_name": "Pending", "note": "é" * (i % 7) + "x" * note_size}
+            for i in range(1, n + 1)]
+
+
+@pytest.fixture
+def state_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(order_loader, "ORDER_STATE_FILE", str(tmp_path / "order_state.json"))
+    monkeypatch.setattr(order_loader, "CHECKSUM_FILE", str(tmp_path / "order_checksum.txt"))
+    monkeypatch.setattr(order_loader, "ORDER_HASHES_FILE", str(tmp_path / "order_hashes.json"))
+
+
+def test_records_straddling_read_blocks(tmp_path):
+    # ~3.3 MB of records, so several land across the 1 MB block boundaries
+    orders = _orders(1500, note_size=2200)
+    path = tmp_path / "orders.json"
+    path.write_text(json.dumps(orders, ensure_ascii=False, indent=1), encoding="utf-8")
+    assert path.stat().st_size > 3 * order_loader.READ_BLOCK_SIZE
+
+    assert list(iter_raw_orders(str(path))) == orders
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 64])
+def test_tiny_read_blocks(tmp_path, monkeypatch, block_size):
+    monkeypatch.setattr(order_loader, "READ_BLOCK_SIZE", block_size)
+    orders = _orders(20)
+    path = tmp_path / "orders.json"
+    write_orders_json(orders, str(path))
+
+    assert list(iter_raw_orders(str(path))) == orders
+
+
+def test_empty_and_invalid_files(tmp_path):
+    path = tmp_path / "orders.json"
+    path.write_text(" [ ]\n", encoding="utf-8")
+    assert list(iter_raw_orders(str(path))) == []
+
+    path.write_text('{"id": 1}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_raw_orders(str(path)))
+
+    path.write_text('[{"id": 1}, {"id": ', encoding="utf-8")
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_raw_orders(str(path)))
+
+
+def test_diff_order_hashes():
+    orders = _orders(4)
+    _, hashes, _ = diff_order_hashes(orders, {})
+
+    updated = [dict(o) for o in orders[1:]] + [{"id": 5, "orderno": "ON0000005"}]
+    updated[0]["status_name"] = "Completed"
+    _, _, diff = diff_order_hashes(updated, hashes)
+
+    assert (diff.added, diff.changed, diff.deleted) == (["5"], ["2"], ["1"])
+
+
+def test_sync_orders_tracks_changes(tmp_path, state_files):
+    path = str(tmp_path / "orders.json")
+    orders = _orders(3)
+    write_orders_json(orders, path)
+
+    _, diff = sync_orders(path)
+    assert diff.added == ["1", "2", "3"] and diff.previous_checksum is None
+
+    # Unchanged file: served from the size/mtime fast path without reading the hashes
+    def no_hashes(state):
+        raise AssertionError("per-order hashes read on the fast path")
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(order_loader, "load_order_hashes", no_hashes)
+        synced, unchanged = sync_orders(path)
+    assert synced == orders and not unchanged.has_changes
+    assert unchanged.checksum == diff.checksum
+
+    orders[2]["status_name"] = "Cancelled"
+    write_orders_json(orders[1:], path)
+    _, diff2 = sync_orders(path)
+    assert (diff2.added, diff2.changed, diff2.deleted) == ([], ["3"], ["1"])
+    assert diff2.previous_checksum == diff.checksum
+
+
+def test_state_header_stays_small(tmp_path, state_files):
+    path = str(tmp_path / "orders.json")
+    write_orders_json(_orders(50), path)
+    sync_orders(path)
+
+    with open(order_loader.ORDER_STATE_FILE, encoding="utf-8") as f:
+        state = json.load(f)
+    assert "hashes" not in state
+    assert len(order_loader.load_order_hashes(state)) == 50
+    assert not [p for p in tmp_path.iterdir() if p.name.endswith(".tmp")]
+
+
+def test_legacy_state_with_inline_hashes(tmp_path, state_files):
+    path = str(tmp_path / "orders.json")
+    orders = _orders(3)
+    write_orders_json(orders, path)
+    _, _, first = diff_order_hashes(orders, {})
+    legacy = {"size": 0, "mtime_ns": 0, "checksum": first.checksum,
+              "hashes": {order_loader.order_key(o): order_loader.record_hash(o) for o in orders}}
+    with open(order_loader.ORDER_STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(legacy, f)
+
+    _, diff = sync_orders(path)
+    assert not diff.has_changes and diff.previous_checksum == first.checksum
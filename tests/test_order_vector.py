@@ -0,0 +1,106 @@
+# tests/test_order_vector.py
+
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+import app.order_vector as order_vector
+import app.vector_store as vector_store
+from app.index_snapshot import load_snapshot
+from app.vector_store import VectorStore
+
+DIM = 16
+
+
+@pytest.fixture
+def int8_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(order_vector, "ORDER_SNAPSHOT_PATH", str(tmp_path / "order_index.snap"))
+    monkeypatch.setattr(order_vector, "ORDER_EMBEDDINGS_PATH", str(tmp_path / "missing.npy"))
+    monkeypatch.setattr(order_vector, "ORDER_VECTOR_STORAGE", "int8")
+    monkeypatch.setattr(order_vector, "COMPRESSED_SECTION", "vectors.int8")
+    monkeypatch.setattr(order_vector, "read_source_checksum", lambda: "abc")
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(200, DIM)).astype(np.float32)
+    chunks = [f"orderno: ON{i:07d} || status_name: Completed" for i in range(200)]
+    return embeddings, chunks
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    calls = []
+    build = vector_store.build_compressed_index
+
+    def counting_build(embeddings, storage):
+        calls.append(storage)
+        return build(embeddings, storage)
+
+    monkeypatch.setattr(order_vector, "build_compressed_index", counting_build)
+    monkeypatch.setattr(vector_store, "build_compressed_index", counting_build)
+    return calls
+
+
+def test_snapshot_persists_trained_index(int8_snapshot, builds):
+    embeddings, chunks = int8_snapshot
+    order_vector.save_order_snapshot(embeddings, chunks, "abc")
+    assert builds == ["int8"]
+
+    snapshot = load_snapshot(order_vector.ORDER_SNAPSHOT_PATH)
+    assert "vectors.int8" in snapshot.sections
+    store, _, _ = order_vector.build_order_index()
+    # Loading the index deserializes the codes instead of retraining
+    assert builds == ["int8"]
+    assert store.compressed.ntotal == len(chunks)
+
+    exact = VectorStore(DIM)
+    exact.attach(embeddings, chunks)
+    for query in embeddings[:5]:
+        assert store.search_ids(query, 3) == exact.search_ids(query, 3)
+
+
+def test_snapshot_without_trained_index_is_upgraded_once(int8_snapshot, builds, monkeypatch):
+    embeddings, chunks = int8_snapshot
+    monkeypatch.setattr(order_vector, "ORDER_VECTOR_STORAGE", "float32")
+    order_vector.save_order_snapshot(embeddings, chunks, "abc")
+    monkeypatch.setattr(order_vector, "ORDER_VECTOR_STORAGE", "int8")
+
+    order_vector.build_order_index()
+    assert builds == ["int8"]
+    assert "vectors.int8" in load_snapshot(order_vector.ORDER_SNAPSHOT_PATH).sections
+
+    order_vector.build_order_index()
+    assert builds == ["int8"]
+
+
+def test_unknown_storage_mode_is_rejected():
+    with pytest.raises(ValueError):
+        vector_store.build_compressed_index(np.zeros((4, DIM), dtype=np.float32), "pq")
+
+
+def test_build_lock_excludes_other_holders(int8_snapshot):
+    fcntl = pytest.importorskip("fcntl")
+    with order_vector.order_build_lock():
+        with open(f"{order_vector.ORDER_SNAPSHOT_PATH}.lock", "a") as other:
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def test_waiting_worker_reuses_snapshot_built_under_the_lock(int8_snapshot, monkeypatch):
+    embeddings, chunks = int8_snapshot
+    lock = order_vector.order_build_lock
+
+    @contextmanager
+    def lock_won_by_another_worker():
+        with lock():
+            # Another worker finished the build while this one was waiting
+            order_vector.save_order_snapshot(embeddings, chunks, "abc")
+            yield
+
+    def rebuild(*args, **kwargs):
+        raise AssertionError("the corpus was embedded twice")
+
+    monkeypatch.setattr(order_vector, "order_build_lock", lock_won_by_another_worker)
+    monkeypatch.setattr(order_vector, "rebuild_order_snapshot", rebuild)
+    store, index_chunks, _ = order_vector.build_order_index()
+    assert list(index_chunks) == chunks
+    assert store.compressed.ntotal == len(chunks)
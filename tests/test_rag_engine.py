@@ -0,0 +1,94 @@
+# tests/test_rag_engine.py
+
+from datetime import datetime
+
+import pytest
+
+import app.rag_engine as rag_engine
+from app.chat_session import ChatSession, is_follow_up
+from app.rag_engine import RAGEngine
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = []
+
+    def fake_llm(query, chunks, session=None):
+        calls.append((query, list(chunks)))
+        return "llm answer"
+
+    monkeypatch.setattr(rag_engine, "run_llm_query", fake_llm)
+    return calls
+
+
+@pytest.fixture
+def engine():
+    now = datetime.now().isoformat(timespec="seconds")
+    engine = RAGEngine()
+    engine.raw_orders = [
+        {"id": 1, "orderno": "ON0000001", "status_name": "Completed", "created_at": now},
+        {"id": 2, "orderno": "ON0000002", "status_name": "Cancelled", "created_at": now},
+        {"id": 3, "orderno": "ON0000003", "status_name": "Cancelled", "created_at": "2001-01-01T00:00:00"},
+    ]
+    engine.text_chunks = [f"orderno: {o['orderno']} || status_name: {o['status_name']}" for o in engine.raw_orders]
+    engine.is_loaded = True
+    return engine
+
+
+def test_is_follow_up():
+    assert is_follow_up("and when was it updated?")
+    assert is_follow_up("what about the quantity")
+    assert not is_follow_up("completed orders this month")
+    assert not is_follow_up("cancelled orders from that branch")
+
+
+def test_new_filter_in_session_is_not_a_follow_up(engine, llm_calls):
+    session = ChatSession("chat")
+    first = engine.query("show completed orders", session=session)
+    assert "1 matching orders found." in first[0]
+    assert session.has_context()
+
+    # Has a pronoun-free date filter: must be filtered, not answered from the previous context
+    second = engine.query("cancelled orders this month", session=session)
+    assert second[0].startswith("1 orders created between")
+    assert "Status: Cancelled" in second[0]
+
+    # Even with a pronoun, a status keyword means a fresh filter
+    third = engine.query("are they cancelled?", session=session)
+    assert "2 matching orders found." in third[0]
+    assert not llm_calls
+
+
+def test_follow_up_reuses_session_context(engine, llm_calls):
+    session = ChatSession("chat")
+    engine.query("status of ON0000002", session=session)
+    assert llm_calls[-1][1] == [engine.text_chunks[1]]
+
+    assert engine.query("and when was it updated?", session=session) == ["llm answer"]
+    assert llm_calls[-1] == ("and when was it updated?", [engine.text_chunks[1]])
+
+
+class StubRetriever:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.queries = []
+
+    def search(self, query, top_k=5):
+        self.queries.append(query)
+        return self.chunks[:top_k]
+
+
+def test_unfiltered_count_question_keeps_the_summary(engine, llm_calls):
+    engine.retriever = StubRetriever(engine.text_chunks)
+    answer = engine.query("how many orders are there")
+    assert answer[0].startswith("3 matching orders found.")
+    assert not engine.retriever.queries and not llm_calls
+
+
+def test_free_text_question_uses_retrieval(engine, llm_calls):
+    engine.retriever = StubRetriever(engine.text_chunks[1:2])
+    session = ChatSession("chat")
+    assert engine.query("which order was delivered to the Dammam branch", session=session) == ["llm answer"]
+    assert engine.retriever.queries == ["which order was delivered to the Dammam branch"]
+    assert llm_calls[-1][1] == [engine.text_chunks[1]]
+    assert session.context_chunks == [engine.text_chunks[1]]
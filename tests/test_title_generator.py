@@ -0,0 +1,119 @@
+# tests/test_title_generator.py
+
+import threading
+import time
+from collections import OrderedDict
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+import app.title_generator as title_generator
+from app.title_generator import FALLBACK_TITLE, extract_title, get_title, request_title
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(title_generator, "_cache", OrderedDict())
+    monkeypatch.setattr(title_generator, "_pending", 0)
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """
+    Stub model whose answers are held until `release` is set.
+    """
+    class StubLLM:
+        def __init__(self):
+            self.release = threading.Event()
+            self.calls = []
+            self.title = "Riyadh Completed Deliveries"
+
+        def __call__(self, message):
+            self.calls.append(message)
+            self.release.wait(5)
+            return f'"{self.title}"'
+
+    stub = StubLLM()
+    monkeypatch.setattr(title_generator, "generate_title_from_model", stub)
+    yield stub
+    stub.release.set()
+
+
+def wait_final(title_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        entry = get_title(title_id)
+        if entry["final"]:
+            return entry
+        time.sleep(0.01)
+    raise AssertionError("title never became final")
+
+
+def test_extract_title():
+    assert extract_title("Show me all completed orders for the Riyadh branch this month") == "Completed Riyadh Branch"
+    assert extract_title("trucks moving in the eastern region with diesel fuel") == "Moving Eastern Region"
+    # Acronyms keep their case and IDs are dropped
+    assert extract_title("How many GPS alarms did AFAQY report yesterday") == "GPS Alarms AFAQY Report Yesterday"
+    assert extract_title("status of ON0012345") == "Status"
+    assert extract_title("what is it") == FALLBACK_TITLE
+
+
+def test_cache_evicts_least_recently_used(llm, monkeypatch):
+    monkeypatch.setattr(title_generator, "TITLE_MAX_PENDING", 0)
+    first = request_title("message number zero")["title_id"]
+    for i in range(1, title_generator.TITLE_CACHE_MAX_ENTRIES):
+        title_generator._store(f"key-{i}", f"title {i}", final=True)
+    assert len(title_generator._cache) == title_generator.TITLE_CACHE_MAX_ENTRIES
+
+    # A cache hit refreshes the entry, so the oldest untouched key goes instead
+    assert request_title("message number zero")["title_id"] == first
+    title_generator._store("one more", "title", final=True)
+
+    assert len(title_generator._cache) == title_generator.TITLE_CACHE_MAX_ENTRIES
+    assert get_title(first) is not None
+    assert get_title("key-1") is None
+    assert get_title("key-2") is not None
+
+
+def test_post_then_poll_for_the_llm_title(llm):
+    client = TestClient(main.app)
+    message = "Completed orders for the Riyadh branch"
+
+    first = client.post("/generate_title", json={"message": message}).json()
+    assert first["final"] is False
+    assert first["title"] == extract_title(message)
+
+    polled = client.get(f"/generate_title/{first['title_id']}").json()
+    assert polled == first
+
+    llm.release.set()
+    assert wait_final(first["title_id"])["title"] == "Riyadh Completed Deliveries"
+    final = client.get(f"/generate_title/{first['title_id']}").json()
+    assert final == {"title_id": first["title_id"], "title": "Riyadh Completed Deliveries", "final": True}
+
+    # Same message again is served from the cache without another LLM call
+    assert client.post("/generate_title", json={"message": message}).json() == final
+    assert len(llm.calls) == 1
+    assert client.get("/generate_title/unknown").status_code == 404
+
+
+def test_llm_failure_keeps_the_extracted_title(llm):
+    llm.title = FALLBACK_TITLE
+    llm.release.set()
+    result = request_title("diesel trucks in the eastern region")
+    assert wait_final(result["title_id"])["title"] == result["title"]
+
+
+def test_saturated_queue_falls_back_to_extracted_titles(llm, monkeypatch):
+    monkeypatch.setattr(title_generator, "TITLE_MAX_PENDING", 1)
+    queued = request_title("cement deliveries in Jeddah")
+    dropped = request_title("gravel deliveries in Dammam")
+
+    assert queued["final"] is False
+    assert dropped == {"title_id": dropped["title_id"], "title": "Gravel Deliveries Dammam", "final": True}
+
+    llm.release.set()
+    wait_final(queued["title_id"])
+    assert title_generator._pending == 0
+    assert len(llm.calls) == 1
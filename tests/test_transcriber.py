@@ -0,0 +1,143 @@
+# tests/test_transcriber.py
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+import app.transcriber as transcriber
+from app.transcriber import TranscriptionPool
+
+
+def test_stream_leaves_workers_for_other_queries(monkeypatch):
+    active, peak = 0, 0
+    lock = threading.Lock()
+
+    def fake_transcribe(samples):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.01)
+        with lock:
+            active -= 1
+        return f"segment {int(samples[0])}"
+
+    segments = [(i * 10, i * 10 + 10) for i in range(8)]
+    monkeypatch.setattr(transcriber, "decode_audio", lambda data: np.arange(80, dtype=np.float32))
+    monkeypatch.setattr(transcriber, "split_on_silence", lambda samples: segments)
+    monkeypatch.setattr(transcriber, "transcribe_samples", fake_transcribe)
+
+    pool = TranscriptionPool(workers=4, queue_size=0)
+    pool._executor = ThreadPoolExecutor(max_workers=pool.workers)
+
+    async def collect():
+        return [event async for event in pool.transcribe_stream(b"audio")]
+
+    try:
+        events = asyncio.run(collect())
+    finally:
+        pool._executor.shutdown()
+
+    assert peak == 2
+    assert [event["text"] for event in events] == [f"segment {start}" for start, _ in segments]
+    assert events[-1]["transcript"] == " ".join(f"segment {start}" for start, _ in segments)
+    assert pool.pending == 0
+
+
+def test_stream_concurrency_floor():
+    assert TranscriptionPool(workers=1).stream_concurrency == 1
+    assert TranscriptionPool(workers=3).stream_concurrency == 1
+    assert TranscriptionPool(workers=8).stream_concurrency == 4
+
+
+class BrokenExecutor(ThreadPoolExecutor):
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool("a worker died"))
+        return future
+
+
+def _starting_pool(starts):
+    pool = TranscriptionPool(workers=2)
+
+    def start():
+        time.sleep(0.2)
+        starts.append(threading.current_thread() is threading.main_thread())
+        pool._executor = ThreadPoolExecutor(max_workers=pool.workers)
+
+    pool.start = start
+    return pool
+
+
+def test_concurrent_requests_start_the_pool_once_off_the_loop():
+    starts, ticks = [], []
+    pool = _starting_pool(starts)
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.005)
+
+    async def main():
+        return await asyncio.gather(ticker(), *(pool.run(len, "abc") for _ in range(4)))
+
+    try:
+        _, *results = asyncio.run(main())
+    finally:
+        pool.shutdown()
+
+    assert results == [3, 3, 3, 3]
+    assert starts == [False]
+    # The event loop kept running while the workers started
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.1
+
+
+def test_broken_pool_is_replaced():
+    starts = []
+    pool = _starting_pool(starts)
+    pool._executor = BrokenExecutor(max_workers=1)
+
+    async def main():
+        with pytest.raises(BrokenProcessPool):
+            await pool.run(len, "abc")
+        assert pool._executor is None and pool.pending == 0
+        await pool._restart_task
+        return await pool.run(len, "abcd")
+
+    try:
+        assert asyncio.run(main()) == 4
+    finally:
+        pool.shutdown()
+    assert starts == [False]
+
+
+def _tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * transcriber.WHISPER_SAMPLE_RATE)) / transcriber.WHISPER_SAMPLE_RATE
+    return (0.5 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def test_forced_cuts_do_not_overlap():
+    silence = np.zeros(transcriber.WHISPER_SAMPLE_RATE, dtype=np.float32)
+    samples = np.concatenate([silence, _tone(45), silence])
+    ranges = transcriber.split_on_silence(samples)
+
+    assert len(ranges) == 3
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+    # Silence boundaries are still padded
+    pad = transcriber.VAD_PAD_MS * transcriber.WHISPER_SAMPLE_RATE // 1000
+    assert ranges[0][0] <= transcriber.WHISPER_SAMPLE_RATE - pad
+    assert ranges[-1][1] >= len(samples) - transcriber.WHISPER_SAMPLE_RATE + pad
+
+
+def test_silence_splits_are_padded():
+    gap = np.zeros(transcriber.WHISPER_SAMPLE_RATE, dtype=np.float32)
+    ranges = transcriber.split_on_silence(np.concatenate([_tone(2), gap, _tone(2)]))
+    assert len(ranges) == 2
+    assert ranges[0][1] > 2 * transcriber.WHISPER_SAMPLE_RATE
+    assert ranges[1][0] < 3 * transcriber.WHISPER_SAMPLE_RATE
@@ -0,0 +1,40 @@
+# tests/test_utils.py
+
+from app.utils import flatten_json, iter_chunks, iter_flatten
+
+RECORD = {
+    "id": 7,
+    "name": "Truck 7",
+    "last_update": {"spd": 42.5, "loc": {"lat": 24.7, "lng": 46.7}},
+    "items": [{"name": "a", "qty": 1}, {"name": "b", "qty": 2}],
+}
+
+
+def test_iter_flatten_matches_flatten_json_order():
+    assert list(iter_flatten(RECORD)) == flatten_json(RECORD)
+    assert flatten_json(RECORD)[:3] == ["id: 7", "name: Truck 7", "last_update.spd: 42.500000"]
+
+
+def test_include_keeps_fields_and_their_children():
+    assert list(iter_flatten(RECORD, include=["last_update.loc", "items.*.name"])) == [
+        "last_update.loc.lat: 24.700000",
+        "last_update.loc.lng: 46.700000",
+        "items.0.name: a",
+        "items.1.name: b",
+    ]
+
+
+def test_include_skips_scalar_ancestors_of_a_pattern():
+    assert list(iter_flatten({"last_update": None}, include=["last_update.spd"])) == []
+    assert list(iter_flatten({"items": "n/a", "id": 1}, include=["items.*.name", "id"])) == ["id: 1"]
+
+
+def test_exclude_drops_fields():
+    flat = list(iter_flatten(RECORD, exclude=["last_update", "items.*.qty"]))
+    assert flat == ["id: 7", "name: Truck 7", "items.0.name: a", "items.1.name: b"]
+
+
+def test_iter_chunks_tags_record_ids_and_dedupes():
+    chunks = list(iter_chunks([RECORD, dict(RECORD)], chunk_size=3, dedupe=True))
+    assert {chunk.record_id for chunk in chunks} == {"7"}
+    assert len(chunks) == len({chunk.text for chunk in chunks})